@@ -1,15 +1,38 @@
 #!/usr/bin/env python3
+import os
 import json
+import queue
+import atexit
 import logging
 import sys
 import importlib
-from logging.handlers import RotatingFileHandler
+import threading
+from functools import lru_cache
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable, Set, Tuple
+
+try:
+    # Rust JSON library, much faster than the stdlib json module
+    import orjson
+except ImportError:
+    orjson = None
 
 # Constants
 ENCODING = "utf-8"
 DEFAULT_CONFIG_FILE = "module_config.json"
+LOG_BUFFER_SIZE = 65536  # Bytes of file log output buffered between writes to disk
+MAX_LOG_BYTES = 10485760  # Default size a log file may reach before it is rotated
+
+# Background listeners writing each configured logger's records, keyed by logger name
+LISTENERS: Dict[str, QueueListener] = {}
+
+# (config_path, log_dir) each configured logger was last set up with, keyed by logger name
+CONFIGURED_LOGGERS: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+# Log directories already created by this process, guarded by CREATED_DIRS_LOCK
+CREATED_DIRS: Set[Path] = set()
+CREATED_DIRS_LOCK = threading.Lock()
 
 # Initialize paths - handling both frozen (PyInstaller) and regular Python execution
 if getattr(sys, 'frozen', False):
@@ -19,10 +42,139 @@ else:
     # Running as script
     MODULE_DIR = Path(__file__).parent.absolute()
 
+class BufferedRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotating file handler that buffers log output instead of flushing every record.
+    
+    Records below WARNING stay in the file buffer, so a burst of log lines
+    costs one write instead of one per line. WARNING and above are flushed
+    straight away. Behind a FlushingQueueListener the buffer is also flushed
+    whenever the queue runs empty, so nothing waits in it while the logger is
+    idle. Rollover and close flush whatever is buffered, and
+    logging.shutdown() closes all handlers at interpreter exit.
+    
+    The file size is tracked from the bytes written instead of asking the
+    file on every record, and the file is rotated before a record would take
+    it past maxBytes.
+    """
+    
+    def __init__(self, *args, buffer_size: int = LOG_BUFFER_SIZE, **kwargs):
+        self.buffer_size = buffer_size
+        self.stream_size = 0
+        super().__init__(*args, **kwargs)
+    
+    def _open(self):
+        """Open the log file with a buffer of buffer_size bytes and note its current size."""
+        stream = open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                      encoding=self.encoding, errors=getattr(self, 'errors', None))
+        self.stream_size = os.fstat(stream.fileno()).st_size
+        return stream
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        """Write a record, rolling the file over first if it would grow past maxBytes, and flush for warnings."""
+        try:
+            msg = self.format(record) + self.terminator
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes > 0:
+                msg_size = len(msg.encode(self.stream.encoding, errors='replace'))
+                # A record is never rotated into an otherwise empty file
+                if self.stream_size and self.stream_size + msg_size > self.maxBytes:
+                    self.doRollover()
+                    if self.stream is None:
+                        self.stream = self._open()
+                self.stream_size += msg_size
+            self.stream.write(msg)
+            if record.levelno >= logging.WARNING:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+class FlushingQueueListener(QueueListener):
+    """
+    Queue listener that flushes its handlers whenever the queue runs empty.
+    
+    A burst of records is written out with a single flush once the last of
+    them is handled, and records logged before a quiet period reach the log
+    file straight away instead of waiting in a handler buffer.
+    """
+    
+    def handle(self, record: logging.LogRecord) -> None:
+        """Handle a record, then flush the handlers if no more records are queued."""
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                try:
+                    handler.flush()
+                except Exception:
+                    handler.handleError(record)
+
+@lru_cache(maxsize=8)
+def read_config_data(config_path: str, mtime_ns: int) -> Dict[str, Any]:
+    """
+    Parse a logging config file, cached per path and modification time.
+    
+    The returned dictionary is shared between callers and must not be modified.
+    
+    Args:
+        config_path: Path to the config file
+        mtime_ns: Modification time of the config file in nanoseconds
+        
+    Returns:
+        Dict containing the parsed configuration
+    """
+    if orjson is not None:
+        with open(config_path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(config_path, 'r', encoding=ENCODING) as f:
+        return json.loads(f.read())
+
+@lru_cache(maxsize=16)
+def get_formatter(fmt: str, datefmt: str) -> logging.Formatter:
+    """
+    Get a log formatter, shared between all handlers using the same formats.
+    
+    Args:
+        fmt: Log record format string
+        datefmt: Date format string
+        
+    Returns:
+        Formatter for the given formats
+    """
+    return logging.Formatter(fmt, datefmt)
+
+@lru_cache(maxsize=1)
+def find_config_path() -> Path:
+    """
+    Find the default logging config file, probing the search locations once per process.
+    
+    Returns:
+        Path to the first config file that exists, or the module directory
+        default if none does
+    """
+    # Try multiple possible locations in order of preference
+    possible_config_paths = [
+        MODULE_DIR / DEFAULT_CONFIG_FILE,  # In logger_utils directory
+        MODULE_DIR / "config" / DEFAULT_CONFIG_FILE,  # In logger_utils/config directory
+        MODULE_DIR / "config" / "config.json",  # In logger_utils/config as config.json
+        MODULE_DIR.parent / DEFAULT_CONFIG_FILE,  # In parent directory
+    ]
+    
+    # Use the first config file that exists
+    for path in possible_config_paths:
+        if os.path.exists(path):
+            return path
+    
+    # If no config file found, default to the module directory
+    return MODULE_DIR / DEFAULT_CONFIG_FILE
+
 def load_config(config_path: Optional[Path] = None) -> Dict[str, Any]:
     """
     Load logging configuration from the specified path or default location.
     Search for the config file in multiple locations for better flexibility.
+    Parsed files are cached until they change, so treat the result as read-only.
     
     Args:
         config_path: Optional path to the config file
@@ -31,28 +183,11 @@ def load_config(config_path: Optional[Path] = None) -> Dict[str, Any]:
         Dict containing the logging configuration
     """
     if config_path is None:
-        # Try multiple possible locations in order of preference
-        possible_config_paths = [
-            MODULE_DIR / DEFAULT_CONFIG_FILE,  # In logger_utils directory
-            MODULE_DIR / "config" / DEFAULT_CONFIG_FILE,  # In logger_utils/config directory
-            MODULE_DIR / "config" / "config.json",  # In logger_utils/config as config.json
-            MODULE_DIR.parent / DEFAULT_CONFIG_FILE,  # In parent directory
-        ]
-        
-        # Use the first config file that exists
-        for path in possible_config_paths:
-            if path.exists():
-                config_path = path
-                break
-        
-        # If no config file found, default to the module directory
-        if config_path is None:
-            config_path = MODULE_DIR / DEFAULT_CONFIG_FILE
+        config_path = find_config_path()
     
     try:
-        with open(config_path, 'r', encoding=ENCODING) as f:
-            config_data = json.load(f)
-            return config_data
+        # Keyed on the modification time, so an edited config file is parsed again
+        return read_config_data(str(config_path), os.stat(config_path).st_mtime_ns)
     except Exception as e:
         # If we can't load the config, use basic defaults
         return {
@@ -62,6 +197,90 @@ def load_config(config_path: Optional[Path] = None) -> Dict[str, Any]:
             }
         }
 
+def stop_queue_listener(logger_name: str) -> None:
+    """
+    Stop a logger's background listener, if running, and close its handlers.
+    
+    The logger's queue handler forgets the stopped listener, so a record
+    logged afterwards starts a new one instead of waiting in an unread queue.
+    
+    Args:
+        logger_name: Name of the logger whose listener should be stopped
+    """
+    CONFIGURED_LOGGERS.pop(logger_name, None)
+    listener = LISTENERS.pop(logger_name, None)
+    if listener is None:
+        return
+    
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    for handler in logging.getLogger(logger_name).handlers:
+        if isinstance(handler, LazyQueueHandler):
+            with handler.start_lock:
+                if handler.listener is listener:
+                    handler.listener = None
+
+def stop_queue_listeners() -> None:
+    """
+    Stop all background log listeners, writing out any records still queued.
+    
+    Their handlers are closed too, so buffered file output reaches disk.
+    Registered with atexit, so it runs before logging.shutdown().
+    """
+    CONFIGURED_LOGGERS.clear()
+    for logger_name in list(LISTENERS):
+        stop_queue_listener(logger_name)
+
+atexit.register(stop_queue_listeners)
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Queue handler that builds the real handlers and starts their listener on the first record.
+    
+    Logging calls return after a queue put, while console and file I/O happens
+    on the listener thread. A logger that is set up but never emits a record
+    creates no log directory, opens no file and starts no thread.
+    """
+    
+    def __init__(self, logger_name: str, build_handlers: Callable[[], List[logging.Handler]],
+                 start_message: Optional[str] = None, start_args: tuple = ()):
+        """
+        Args:
+            logger_name: Name of the logger this handler is attached to
+            build_handlers: Callable creating the handlers that write the records
+            start_message: Optional INFO message format logged once the listener is running
+            start_args: Arguments merged into start_message when it is logged
+        """
+        super().__init__(queue.SimpleQueue())
+        self.logger_name = logger_name
+        self.build_handlers = build_handlers
+        self.start_message = start_message
+        self.start_args = start_args
+        self.listener: Optional[QueueListener] = None
+        self.start_lock = threading.Lock()
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queue a record, starting the listener first if this is the first one."""
+        if self.listener is None:
+            with self.start_lock:
+                if self.listener is None:
+                    self.start_listener()
+        super().enqueue(record)
+    
+    def start_listener(self) -> None:
+        """Build the real handlers and start the listener thread serving them."""
+        listener = FlushingQueueListener(self.queue, *self.build_handlers(), respect_handler_level=True)
+        listener.start()
+        LISTENERS[self.logger_name] = listener
+        self.listener = listener
+        
+        # Queued ahead of the record that triggered the start, and skipped
+        # when INFO records would not get past this handler anyway
+        logger = logging.getLogger(self.logger_name)
+        if self.start_message and logger.isEnabledFor(logging.INFO) and self.level <= logging.INFO:
+            logger.info(self.start_message, *self.start_args)
+
 def get_module_dir(module_name: str) -> Path:
     """
     Get the directory of the specified module.
@@ -101,6 +320,9 @@ def setup_logger(
     """
     Set up a logger with both file and console handlers using the configuration.
     
+    Calling it again with the same arguments returns the already configured
+    logger without reloading the config or replacing its handlers.
+    
     Args:
         module_name: Name of the module (used for the logger name and module-specific settings)
         config_path: Optional path to the config file
@@ -109,57 +331,80 @@ def setup_logger(
     Returns:
         Configured logger instance
     """
+    # Create logger, or reuse it as is if already set up with the same arguments
+    logger = logging.getLogger(f"voice_diary.{module_name}")
+    setup_key = (
+        str(config_path) if config_path is not None else None,
+        str(log_dir) if log_dir is not None else None
+    )
+    if logger.handlers and CONFIGURED_LOGGERS.get(logger.name) == setup_key:
+        return logger
+    
     # Load configuration
     config = load_config(config_path)
     logging_config = config.get("logging", {})
     
-    # Determine module directory and set up log directory within the module directory
+    # Determine module directory and the log directory within it
     module_dir = get_module_dir(module_name)
     logs_dir = Path(log_dir) if log_dir else module_dir / "logs"
-    logs_dir.mkdir(parents=True, exist_ok=True)
     
-    # Get module-specific settings
-    module_config = logging_config.get("modules", {}).get(
-        module_name,
-        logging_config.get("modules", {}).get("default", {})
-    )
+    # Get module-specific settings, falling back to the default module entry
+    module_configs = logging_config.get("modules", {})
+    module_config = module_configs.get(module_name)
+    if module_config is None:
+        module_config = module_configs.get("default", {})
     
-    # Create logger
-    logger = logging.getLogger(f"voice_diary.{module_name}")
     logger.setLevel(logging.DEBUG)  # Set to DEBUG to allow all levels, handlers will filter
+    # The logger writes to its own console and file handlers, so keep records
+    # away from any root handlers (e.g. db_utils configures the root logger)
+    # that would print and store every record a second time
+    logger.propagate = False
     
-    # Clear any existing handlers
-    logger.handlers = []
-    
-    # Console Handler
     console_config = logging_config.get("console", {})
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(getattr(logging, console_config.get("level", "INFO")))
-    console_handler.setFormatter(logging.Formatter(
-        console_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"),
-        console_config.get("date_format", "%H:%M:%S")
-    ))
-    logger.addHandler(console_handler)
-    
-    # File Handler
+    console_level = getattr(logging, console_config.get("level", "INFO"))
     file_config = logging_config.get("file", {})
+    file_level = getattr(logging, module_config.get("level", file_config.get("level", "INFO")))
     log_file = logs_dir / module_config.get("log_filename", file_config.get("log_filename", "voice_diary.log"))
     
-    file_handler = RotatingFileHandler(
-        log_file,
-        maxBytes=file_config.get("max_size_bytes", 1048576),
-        backupCount=file_config.get("backup_count", 5),
-        encoding=file_config.get("encoding", ENCODING)
-    )
-    file_handler.setLevel(getattr(logging, module_config.get("level", file_config.get("level", "INFO"))))
-    file_handler.setFormatter(logging.Formatter(
-        file_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - [%(module)s:%(lineno)d] - %(message)s"),
-        file_config.get("date_format", "%Y-%m-%d %H:%M:%S")
-    ))
-    logger.addHandler(file_handler)
-    
-    # Log file location after logger is configured
-    logger.info(f"Using log file: {log_file}")
+    def build_handlers() -> List[logging.Handler]:
+        """Create the log directory and the console and file handlers."""
+        if logs_dir not in CREATED_DIRS:
+            logs_dir.mkdir(parents=True, exist_ok=True)
+            with CREATED_DIRS_LOCK:
+                CREATED_DIRS.add(logs_dir)
+        
+        # Console Handler
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(get_formatter(
+            console_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - %(message)s"),
+            console_config.get("date_format", "%H:%M:%S")
+        ))
+        
+        # File Handler
+        file_handler = BufferedRotatingFileHandler(
+            log_file,
+            maxBytes=file_config.get("max_size_bytes", MAX_LOG_BYTES),
+            backupCount=file_config.get("backup_count", 5),
+            encoding=file_config.get("encoding", ENCODING)
+        )
+        file_handler.setLevel(file_level)
+        file_handler.setFormatter(get_formatter(
+            file_config.get("format", "%(asctime)s - %(name)s - %(levelname)s - [%(module)s:%(lineno)d] - %(message)s"),
+            file_config.get("date_format", "%Y-%m-%d %H:%M:%S")
+        ))
+        
+        return [console_handler, file_handler]
+    
+    # Replace any existing handlers with a queue whose handlers and listener
+    # thread are only created once the first record is logged. The log file
+    # location is reported at that point
+    stop_queue_listener(logger.name)
+    queue_handler = LazyQueueHandler(logger.name, build_handlers, "Using log file: %s", (log_file,))
+    # Records no handler would accept are dropped before they are queued
+    queue_handler.setLevel(min(console_level, file_level))
+    logger.handlers = [queue_handler]
+    CONFIGURED_LOGGERS[logger.name] = setup_key
     
     return logger
 
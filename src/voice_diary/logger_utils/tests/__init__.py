@@ -0,0 +1 @@
+"""Unit tests for logger_utils module functionality."""
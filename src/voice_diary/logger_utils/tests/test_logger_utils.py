@@ -0,0 +1,196 @@
+"""
+Unit tests for the file handler, queue listener and queued logger setup in the logger_utils module.
+"""
+
+import json
+import logging
+import queue
+import pytest
+
+from src.voice_diary.logger_utils.logger_utils import (
+    BufferedRotatingFileHandler,
+    FlushingQueueListener,
+    LazyQueueHandler,
+    LISTENERS,
+    setup_logger,
+    stop_queue_listener
+)
+
+def make_record(message: str, level: int = logging.INFO) -> logging.LogRecord:
+    """Build a log record carrying message at level"""
+    return logging.LogRecord("voice_diary.test", level, __file__, 1, message, None, None)
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Fixture providing the path of a log file that does not exist yet"""
+    return tmp_path / "test.log"
+
+def make_handler(log_file, **kwargs) -> BufferedRotatingFileHandler:
+    """Create a handler writing bare messages to log_file"""
+    handler = BufferedRotatingFileHandler(log_file, encoding="utf-8", **kwargs)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    return handler
+
+class TestBufferedRotatingFileHandler:
+    """Tests for buffering, flushing and rollover of file log output"""
+    
+    def test_info_records_stay_buffered(self, log_file):
+        """Test records below WARNING are not written until the buffer is flushed"""
+        handler = make_handler(log_file)
+        try:
+            handler.emit(make_record("first"))
+            handler.emit(make_record("second"))
+            
+            assert log_file.read_text(encoding="utf-8") == ""
+        finally:
+            handler.close()
+    
+    def test_warning_flushes_buffered_records(self, log_file):
+        """Test a WARNING record writes itself and everything buffered before it"""
+        handler = make_handler(log_file)
+        try:
+            handler.emit(make_record("context"))
+            handler.emit(make_record("problem", logging.WARNING))
+            
+            assert log_file.read_text(encoding="utf-8") == "context\nproblem\n"
+        finally:
+            handler.close()
+    
+    def test_close_flushes_buffered_records(self, log_file):
+        """Test closing the handler writes out records still in the buffer"""
+        handler = make_handler(log_file)
+        handler.emit(make_record("last words"))
+        
+        handler.close()
+        
+        assert log_file.read_text(encoding="utf-8") == "last words\n"
+    
+    def test_rollover_keeps_files_within_size_limit(self, log_file):
+        """Test the file is rotated before a record would take it past maxBytes"""
+        handler = make_handler(log_file, maxBytes=100, backupCount=3)
+        messages = [f"record {i:02d} " + "x" * 20 for i in range(10)]
+        try:
+            for message in messages:
+                handler.emit(make_record(message))
+        finally:
+            handler.close()
+        
+        # 31-byte records fit three to a file, so ten records fill four files
+        files = [log_file.with_name(f"test.log.{i}") for i in (3, 2, 1)] + [log_file]
+        assert [path.stat().st_size for path in files] == [93, 93, 93, 31]
+        written = "".join(path.read_text(encoding="utf-8") for path in files)
+        assert written == "".join(f"{message}\n" for message in messages)
+
+class TestFlushingQueueListener:
+    """Tests for flushing buffered file output once the log queue is idle"""
+    
+    def test_flushes_once_queue_drains(self, log_file):
+        """Test buffered records are written as soon as no more records are queued"""
+        handler = make_handler(log_file)
+        records = queue.SimpleQueue()
+        listener = FlushingQueueListener(records, handler)
+        try:
+            records.put(make_record("second"))
+            listener.handle(make_record("first"))
+            
+            # Another record is still queued, so the buffer is kept
+            assert log_file.read_text(encoding="utf-8") == ""
+            
+            listener.handle(listener.dequeue(False))
+            
+            assert log_file.read_text(encoding="utf-8") == "first\nsecond\n"
+        finally:
+            handler.close()
+
+def write_logging_config(config_path, console_level: str = "INFO", file_level: str = "INFO"):
+    """Write a logging config giving the test_module logger its own file and levels"""
+    config_path.write_text(json.dumps({
+        "logging": {
+            "console": {"level": console_level},
+            "file": {"format": "%(levelname)s %(message)s"},
+            "modules": {
+                "test_module": {"level": file_level, "log_filename": "test_module.log"}
+            }
+        }
+    }), encoding="utf-8")
+    return config_path
+
+@pytest.fixture
+def logger_paths(tmp_path):
+    """Fixture providing a config file and log directory, stopping the test logger afterwards"""
+    yield write_logging_config(tmp_path / "config.json"), tmp_path / "logs"
+    stop_queue_listener("voice_diary.test_module")
+    logging.getLogger("voice_diary.test_module").handlers = []
+
+class TestSetupLogger:
+    """Tests for the queued, lazily started loggers created by setup_logger"""
+    
+    def test_listener_starts_on_first_record(self, logger_paths):
+        """Test setting up a logger starts no listener and creates no log directory"""
+        config_path, logs_dir = logger_paths
+        logger = setup_logger("test_module", config_path, logs_dir)
+        
+        assert logger.name not in LISTENERS
+        assert not logs_dir.exists()
+        
+        logger.info("first record")
+        
+        assert logger.name in LISTENERS
+        assert logger.handlers[0].listener is LISTENERS[logger.name]
+        assert logs_dir.is_dir()
+    
+    def test_repeat_setup_keeps_single_handler(self, logger_paths, tmp_path):
+        """Test setting up the same logger again never adds a second handler"""
+        config_path, logs_dir = logger_paths
+        logger = setup_logger("test_module", config_path, logs_dir)
+        handler = logger.handlers[0]
+        
+        assert setup_logger("test_module", config_path, logs_dir).handlers == [handler]
+        
+        # New settings replace the handler rather than adding one
+        setup_logger("test_module", config_path, tmp_path / "other_logs")
+        assert len(logger.handlers) == 1
+        assert isinstance(logger.handlers[0], LazyQueueHandler)
+        assert logger.handlers[0] is not handler
+    
+    def test_records_written_after_listeners_stop(self, logger_paths):
+        """Test stopping the listeners writes every queued record to the log file"""
+        config_path, logs_dir = logger_paths
+        logger = setup_logger("test_module", config_path, logs_dir)
+        
+        for i in range(100):
+            logger.info("record %d", i)
+        stop_queue_listener(logger.name)
+        
+        lines = (logs_dir / "test_module.log").read_text(encoding="utf-8").splitlines()
+        assert lines[0] == f"INFO Using log file: {logs_dir / 'test_module.log'}"
+        assert lines[1:] == [f"INFO record {i}" for i in range(100)]
+        assert logger.name not in LISTENERS
+    
+    def test_record_after_stop_restarts_listener(self, logger_paths):
+        """Test a record logged after the listener stops starts a new one"""
+        config_path, logs_dir = logger_paths
+        logger = setup_logger("test_module", config_path, logs_dir)
+        stop_queue_listener(logger.name)
+        
+        logger.info("after stop")
+        assert logger.name in LISTENERS
+        stop_queue_listener(logger.name)
+        
+        lines = (logs_dir / "test_module.log").read_text(encoding="utf-8").splitlines()
+        assert lines[-1] == "INFO after stop"
+    
+    @pytest.mark.parametrize("console_level,file_level,expected", [
+        ("WARNING", "DEBUG", logging.DEBUG),
+        ("DEBUG", "ERROR", logging.DEBUG),
+        ("ERROR", "WARNING", logging.WARNING),
+    ])
+    def test_queue_handler_level_is_lowest_handler_level(self, tmp_path, logger_paths,
+                                                         console_level, file_level, expected):
+        """Test the queue handler only drops records that neither handler would accept"""
+        _, logs_dir = logger_paths
+        config_path = write_logging_config(tmp_path / "levels.json", console_level, file_level)
+        
+        logger = setup_logger("test_module", config_path, logs_dir)
+        
+        assert logger.handlers[0].level == expected
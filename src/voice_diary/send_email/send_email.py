@@ -16,23 +16,30 @@ import json
 import base64
 import re
 import sys
+import stat
 import logging
+import mimetypes
+import mmap
+from contextlib import ExitStack
+from functools import lru_cache
 from logging.handlers import RotatingFileHandler
-import pickle
 from pathlib import Path
 from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
+from email.header import Header
+from email.utils import encode_rfc2231
 from dataclasses import dataclass, field
-from typing import List, Optional, Dict, Any, Union
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from googleapiclient import errors as google_errors
-from cryptography.fernet import Fernet
-import io
-from tqdm import tqdm
+from typing import List, Optional, Dict, Any, Union, Tuple
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
+try:
+    # Rust implementation of Fernet with much lower per-call overhead
+    from rfernet import Fernet as RustFernet
+except ImportError:
+    RustFernet = None
+try:
+    # Rust JSON library, much faster than the stdlib json module
+    import orjson
+except ImportError:
+    orjson = None
 
 # Initialize paths - handling both frozen (PyInstaller) and regular Python execution
 if getattr(sys, 'frozen', False):
@@ -51,6 +58,27 @@ LOGS_DIR = MODULE_DIR / "logs"
 # Required Gmail API scopes
 REQUIRED_SCOPES = ["https://www.googleapis.com/auth/gmail.send"]
 
+# Logging levels accepted for the file and console handlers
+VALID_LOG_LEVELS = frozenset({"DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"})
+
+# RFC 5322 compliant email regex pattern
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$")
+
+# System locations attachments may never be read from, matched case-insensitively
+FORBIDDEN_PATH_PATTERN = re.compile(
+    r"(?i)(/etc/|/var/log/|/proc/|/sys/|c:\\windows\\|c:\\program files\\)"
+)
+
+# Attachments are base64-encoded in blocks of this many bytes. A multiple of 57
+# so every block ends on a complete 76-character base64 line
+BASE64_BLOCK_SIZE = 57 * 16384
+
+# Size of the random nonce prepended to AES-GCM encrypted tokens
+TOKEN_NONCE_SIZE = 12
+
+# Load the system MIME type maps once instead of on the first attachment
+mimetypes.init()
+
 # Configure basic logging until we can load the full config
 def setup_basic_logging():
     """Set up basic logging configuration before loading the full config."""
@@ -87,37 +115,37 @@ def get_config_path() -> Optional[Path]:
     """
     # Ensure config directory exists
     config_dir = MODULE_DIR / "config"
-    if not config_dir.exists():
+    if not os.path.isdir(config_dir):
         try:
             config_dir.mkdir(parents=True, exist_ok=True)
-            logger.info(f"Created config directory: {config_dir}")
+            logger.info("Created config directory: %s", config_dir)
         except Exception as e:
             logger.warning(f"Failed to create config directory: {str(e)}")
     
     # Module-specific config (highest priority)
     module_config = config_dir / "conf_send_email.json"
     if module_config.exists():
-        logger.info(f"Using module-specific config: {module_config}")
+        logger.info("Using module-specific config: %s", module_config)
         return module_config
         
     # Check for config passed as environment variable
     if os.environ.get("EMAIL_SENDER_CONFIG"):
         env_config = Path(os.environ.get("EMAIL_SENDER_CONFIG"))
         if env_config.exists():
-            logger.info(f"Using config from environment variable: {env_config}")
+            logger.info("Using config from environment variable: %s", env_config)
             return env_config
     
     # Check parent directory (project structure) as fallback
     project_root = MODULE_DIR.parent
     project_config = project_root / "project_fallback_config" / "config_send_email" / "conf_send_email.json"
     if project_config.exists():
-        logger.info(f"Using project-level config: {project_config}")
+        logger.info("Using project-level config: %s", project_config)
         return project_config
     
     # Default config in the module directory
     default_config = MODULE_DIR / "conf_send_email.json"
     if default_config.exists():
-        logger.info(f"Using default config: {default_config}")
+        logger.info("Using default config: %s", default_config)
         return default_config
     
     # No valid config found - return module config path for potential creation
@@ -236,10 +264,11 @@ def ensure_directory_exists(directory_path: Union[str, Path], purpose: str = "di
     Raises:
         ConfigError: If directory creation fails
     """
-    dir_path = Path(directory_path)
-    if dir_path.exists():
+    # Fast path: a plain isdir check avoids building a Path for existing directories
+    if os.path.isdir(os.fspath(directory_path)):
         return True
         
+    dir_path = Path(directory_path)
     try:
         dir_path.mkdir(parents=True, exist_ok=True)
         
@@ -259,30 +288,61 @@ def ensure_directory_exists(directory_path: Union[str, Path], purpose: str = "di
             
         raise ConfigError(error_msg)
 
+def validate_logging_config(config: AppConfig) -> List[str]:
+    """
+    Validate the logging section of the configuration.
+    
+    Args:
+        config: Application configuration object
+        
+    Returns:
+        List of validation error messages (empty if logging config is valid)
+    """
+    validation_errors = []
+    
+    if config.logging.file.level not in VALID_LOG_LEVELS:
+        validation_errors.append(f"Invalid file logging level: {config.logging.file.level}")
+        
+    if config.logging.console.level not in VALID_LOG_LEVELS:
+        validation_errors.append(f"Invalid console logging level: {config.logging.console.level}")
+        
+    if config.logging.file.max_size_bytes <= 0:
+        validation_errors.append(f"Invalid max_size_bytes: {config.logging.file.max_size_bytes}")
+        
+    if config.logging.file.backup_count < 0:
+        validation_errors.append(f"Invalid backup_count: {config.logging.file.backup_count}")
+    
+    return validation_errors
+
 def validate_config(config: AppConfig) -> List[str]:
     """
     Validate the configuration with detailed error messages.
     
+    When email sending is disabled only the logging configuration is checked,
+    since the email, attachment and API settings are never used.
+    
     Args:
         config: Application configuration object
         
     Returns:
         List of validation error messages (empty if config is valid)
     """
+    if not config.send_email:
+        return validate_logging_config(config)
+    
     validation_errors = []
     
-    # Check email settings if email sending is enabled
-    if config.send_email:
-        if not config.email.to:
-            validation_errors.append("Email recipient ('to' field) is missing")
-        elif config.validate_email and not validate_email_format(config.email.to):
-            validation_errors.append(f"Invalid email format: {config.email.to}")
-            
-        if not config.email.subject:
-            validation_errors.append("Email subject is missing")
-            
-        if not config.email.message and not config.email.default_message:
-            validation_errors.append("Both email message and default message are missing")
+    # Check email settings
+    if not config.email.to:
+        validation_errors.append("Email recipient ('to' field) is missing")
+    elif config.validate_email and not validate_email_format(config.email.to):
+        validation_errors.append(f"Invalid email format: {config.email.to}")
+        
+    if not config.email.subject:
+        validation_errors.append("Email subject is missing")
+        
+    if not config.email.message and not config.email.default_message:
+        validation_errors.append("Both email message and default message are missing")
     
     # Validate attachment path if provided
     if config.email.attachment and not Path(config.email.attachment).exists():
@@ -293,22 +353,13 @@ def validate_config(config: AppConfig) -> List[str]:
         validation_errors.append("API scopes list is empty")
     elif not all(isinstance(scope, str) for scope in config.api.scopes):
         validation_errors.append("All API scopes must be strings")
-    elif not all(scope in config.api.scopes for scope in REQUIRED_SCOPES):
-        validation_errors.append(f"Missing required scopes: {REQUIRED_SCOPES}")
+    else:
+        missing_scopes = set(REQUIRED_SCOPES) - set(config.api.scopes)
+        if missing_scopes:
+            validation_errors.append(f"Missing required scopes: {sorted(missing_scopes)}")
     
     # Validate logging configuration
-    valid_levels = ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
-    if config.logging.file.level not in valid_levels:
-        validation_errors.append(f"Invalid file logging level: {config.logging.file.level}")
-        
-    if config.logging.console.level not in valid_levels:
-        validation_errors.append(f"Invalid console logging level: {config.logging.console.level}")
-        
-    if config.logging.file.max_size_bytes <= 0:
-        validation_errors.append(f"Invalid max_size_bytes: {config.logging.file.max_size_bytes}")
-        
-    if config.logging.file.backup_count < 0:
-        validation_errors.append(f"Invalid backup_count: {config.logging.file.backup_count}")
+    validation_errors.extend(validate_logging_config(config))
     
     return validation_errors
 
@@ -395,12 +446,32 @@ def create_sample_config(config_path: Optional[Path] = None) -> Dict:
             with open(config_path, 'w', encoding='utf-8') as f:
                 json.dump(default_config, f, indent=2)
                 
-            logger.info(f"Created sample configuration file at: {config_path}")
+            logger.info("Created sample configuration file at: %s", config_path)
         except Exception as e:
             logger.error(f"Failed to create sample configuration file: {str(e)}")
     
     return default_config
 
+@lru_cache(maxsize=4)
+def read_config_data(config_path: str, mtime_ns: Optional[int], size: Optional[int]) -> Dict[str, Any]:
+    """
+    Parse a JSON config file, caching the result per path and file version.
+    
+    The modification time and size are part of the cache key, so an edited
+    file is parsed again. The returned dictionary is shared between calls and
+    must not be modified.
+    
+    Args:
+        config_path: Path to the config file
+        mtime_ns: Modification time of the file in nanoseconds
+        size: Size of the file in bytes
+        
+    Returns:
+        Parsed config data
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 def load_config() -> AppConfig:
     """
     Load application configuration from conf_send_email.json file with enhanced validation
@@ -427,7 +498,7 @@ def load_config() -> AppConfig:
                 try:
                     if not local_config_dir.exists():
                         local_config_dir.mkdir(parents=True, exist_ok=True)
-                        logger.info(f"Created local config directory at {local_config_dir}")
+                        logger.info("Created local config directory at %s", local_config_dir)
                     
                     local_config_path = local_config_dir / "conf_send_email.json"
                     
@@ -441,7 +512,7 @@ def load_config() -> AppConfig:
                         with open(local_config_path, 'w', encoding='utf-8') as dest_file:
                             json.dump(config_data, dest_file, indent=2)
                         
-                        logger.info(f"Created local copy of project configuration at: {local_config_path}")
+                        logger.info("Created local copy of project configuration at: %s", local_config_path)
                 except Exception as e:
                     logger.warning(f"Failed to create local config copy: {str(e)}")
         
@@ -472,7 +543,7 @@ def load_config() -> AppConfig:
                 config_dir = MODULE_DIR / "config"
                 if not config_dir.exists():
                     config_dir.mkdir(parents=True, exist_ok=True)
-                    logger.info(f"Created config directory: {config_dir}")
+                    logger.info("Created config directory: %s", config_dir)
                 
                 # Try writing to config directory first
                 if os.access(config_dir, os.W_OK):
@@ -492,34 +563,44 @@ def load_config() -> AppConfig:
                 
             raise ConfigError(error_msg)
             
-        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-            config_data = json.load(f)
+        config_stat = get_file_stat(CONFIG_FILE)
+        if config_stat is not None:
+            config_data = read_config_data(str(CONFIG_FILE), config_stat.st_mtime_ns, config_stat.st_size)
+        else:
+            # Without a stat result the file version is unknown, so skip the cache
+            config_data = read_config_data.__wrapped__(str(CONFIG_FILE), None, None)
             
+        # Look up each section once and reuse it for all of its keys
+        email_section = config_data.get('email') or {}
+        auth_section = config_data.get('auth') or {}
+        testing_section = config_data.get('testing') or {}
+        api_section = config_data.get('api') or {}
+        
         # Create configuration objects
         email_config = EmailConfig(
-            to=config_data.get('email', {}).get('to', ''),
-            subject=config_data.get('email', {}).get('subject', ''),
-            message=config_data.get('email', {}).get('message', ''),
-            default_message=config_data.get('email', {}).get('default_message', '=== THIS IS A TEST MESSAGE ==='),
-            attachment=config_data.get('email', {}).get('attachment')
+            to=email_section.get('to', ''),
+            subject=email_section.get('subject', ''),
+            message=email_section.get('message', ''),
+            default_message=email_section.get('default_message', '=== THIS IS A TEST MESSAGE ==='),
+            attachment=email_section.get('attachment')
         )
         
         auth_config = AuthConfig(
-            credentials_file=config_data.get('auth', {}).get('credentials_file', 'credentials_gmail.json'),
-            token_file=config_data.get('auth', {}).get('token_file', 'token_gmail.pickle'),
-            token_dir=config_data.get('auth', {}).get('token_dir'),
-            port=config_data.get('auth', {}).get('port', 0),
-            credentials_path=config_data.get('auth', {}).get('credentials_path')
+            credentials_file=auth_section.get('credentials_file', 'credentials_gmail.json'),
+            token_file=auth_section.get('token_file', 'token_gmail.pickle'),
+            token_dir=auth_section.get('token_dir'),
+            port=auth_section.get('port', 0),
+            credentials_path=auth_section.get('credentials_path')
         )
         
         # Extract testing config if available
         testing_config = TestingConfig(
-            dry_run=config_data.get('testing', {}).get('dry_run', False),
-            mock_responses=config_data.get('testing', {}).get('mock_responses', False)
+            dry_run=testing_section.get('dry_run', False),
+            mock_responses=testing_section.get('mock_responses', False)
         )
         
         # Process logging config based on new structure (file & console sections)
-        logging_section = config_data.get('logging', {})
+        logging_section = config_data.get('logging') or {}
         
         # Extract file logging config
         file_section = logging_section.get('file', {})
@@ -565,7 +646,8 @@ def load_config() -> AppConfig:
         )
         
         api_config = ApiConfig(
-            scopes=config_data.get('api', {}).get('scopes', [])
+            # Copied so callers never modify the cached config data
+            scopes=list(api_section.get('scopes', []))
         )
         
         app_config = AppConfig(
@@ -671,32 +753,23 @@ def validate_email_format(email: str) -> bool:
     Returns:
         True if email format is valid, False otherwise
     """
-    # RFC 5322 compliant email regex pattern
-    pattern = r"^[a-zA-Z0-9.!#$%&'*+/=?^_`{|}~-]+@[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?(?:\.[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?)*$"
-    
-    # Simplified validation - check basic pattern and common mistakes
-    if not re.match(pattern, email):
-        return False
-    
-    # Check for leading dots in username
-    username, domain = email.split('@', 1)
-    if username.startswith('.'):
+    # Cheap structural checks first, so malformed addresses are rejected with
+    # plain string scans before the regex engine runs: exactly one '@', no
+    # leading dot in username, no leading, trailing or consecutive dots in domain
+    if email.count('@') != 1:
         return False
     
-    # Check for consecutive dots in domain
-    if '..' in domain:
+    username, _, domain = email.partition('@')
+    if (not username or not domain or username[0] == '.'
+            or domain[0] == '.' or domain[-1] == '.' or '..' in domain):
         return False
     
-    # Check for trailing dots in domain
-    if domain.endswith('.'):
-        return False
-    
-    # Check for leading dots in domain parts
-    domain_parts = domain.split('.')
-    if any(part.startswith('.') or part == '' for part in domain_parts):
+    # Simplified validation - check basic pattern on the remaining candidates
+    if not EMAIL_PATTERN.match(email):
         return False
     
     # Specifically check for overlong domains like example.com.com.com
+    domain_parts = domain.split('.')
     if len(domain_parts) > 3 and len(set(domain_parts[-3:])) < 3:
         return False
     
@@ -744,79 +817,97 @@ def get_credentials_paths(config: AppConfig, logger: logging.Logger) -> tuple:
     Returns:
         Tuple of (credentials_file_path, token_file_path)
     """
-    # Get filenames from config
-    credentials_filename = config.auth.credentials_file
-    token_filename = config.auth.token_file
+    return find_credentials_paths(
+        config.auth.credentials_file,
+        config.auth.token_file,
+        config.auth.credentials_path,
+        config.auth.token_dir,
+        os.environ.get("EMAIL_CREDENTIALS_DIR"),
+        logger
+    )
+
+def iter_credentials_dirs(module_creds_dir: Path, env_creds_dir: Optional[str],
+                          credentials_path: Optional[str]):
+    """
+    Generate the candidate credentials directories in lookup order.
     
+    Candidates are produced lazily, so directories after the first hit are
+    never built or created.
+    
+    Args:
+        module_creds_dir: Credentials directory inside the module directory
+        env_creds_dir: Credentials directory from EMAIL_CREDENTIALS_DIR
+        credentials_path: Absolute or relative credentials directory from config
+        
+    Yields:
+        Tuples of (source description, directory, description used when creating
+        the directory or None if it should not be created)
+    """
+    yield "module directory", module_creds_dir, None
+    
+    if env_creds_dir:
+        yield "environment variable", Path(env_creds_dir), None
+    
+    if credentials_path:
+        if os.path.isabs(credentials_path):
+            yield "absolute path", Path(credentials_path), "credentials directory from config path"
+        else:
+            yield "relative path", MODULE_DIR / Path(credentials_path), "relative credentials directory"
+
+def find_credentials_paths(credentials_filename: str, token_filename: str,
+                           credentials_path: Optional[str], token_dir: Optional[str],
+                           env_creds_dir: Optional[str], logger: logging.Logger) -> tuple:
+    """
+    Resolve credentials file paths from the individual lookup settings.
+    
+    See get_credentials_paths for the lookup order.
+    
+    Args:
+        credentials_filename: Name of the credentials file
+        token_filename: Name of the token file
+        credentials_path: Absolute or relative credentials directory from config
+        token_dir: Token directory from config
+        env_creds_dir: Credentials directory from EMAIL_CREDENTIALS_DIR
+        logger: Logger instance
+        
+    Returns:
+        Tuple of (credentials_file_path, token_file_path)
+    """
     # Make sure credentials directory exists first
     module_creds_dir = MODULE_DIR / "credentials"
-    if not module_creds_dir.exists():
-        try:
-            module_creds_dir.mkdir(parents=True, exist_ok=True)
-            logger.info(f"Created credentials directory: {module_creds_dir}")
-        except Exception as e:
-            logger.warning(f"Failed to create credentials directory: {str(e)}")
+    try:
+        ensure_directory_exists(module_creds_dir, "credentials directory", logger)
+    except ConfigError as e:
+        logger.warning(f"Failed to create credentials directory: {str(e)}")
+    
+    # Memoized existence checks, so no candidate file is stat'ed twice
+    exists_cache: Dict[str, bool] = {}
+    
+    def file_exists(file_path: Path) -> bool:
+        key = str(file_path)
+        if key not in exists_cache:
+            exists_cache[key] = file_path.exists()
+        return exists_cache[key]
+    
+    # Candidates are generated in priority order and the first hit wins
+    for source, creds_dir, dir_description in iter_credentials_dirs(module_creds_dir, env_creds_dir, credentials_path):
+        if dir_description:
+            try:
+                ensure_directory_exists(creds_dir, dir_description, logger)
+            except ConfigError as e:
+                logger.warning(f"Failed to create {dir_description}: {str(e)}")
+        
+        creds_file = creds_dir / credentials_filename
+        if file_exists(creds_file):
+            logger.info("Using credentials from %s: %s", source, creds_dir)
+            return creds_file, creds_dir / token_filename
     
-    # First check for credentials directly in the module directory (highest priority)
     module_creds_path = module_creds_dir / credentials_filename
     module_token_path = module_creds_dir / token_filename
     
-    if module_creds_path.exists():
-        logger.info(f"Using credentials from module directory: {module_creds_dir}")
-        return module_creds_path, module_token_path
-    
-    # Check for environment variable (second priority)
-    if os.environ.get("EMAIL_CREDENTIALS_DIR"):
-        env_creds_dir = Path(os.environ.get("EMAIL_CREDENTIALS_DIR"))
-        env_creds_path = env_creds_dir / credentials_filename
-        env_token_path = env_creds_dir / token_filename
-        
-        if env_creds_path.exists():
-            logger.info(f"Using credentials from environment variable: {env_creds_dir}")
-            return env_creds_path, env_token_path
-    
-    # Check for absolute path in config (third priority) - supports packaged apps
-    if config.auth.credentials_path:
-        creds_path = config.auth.credentials_path
-        
-        # If it's an absolute path, use it directly
-        if os.path.isabs(creds_path):
-            abs_creds_dir = Path(creds_path)
-            # Create directory if it doesn't exist
-            if not abs_creds_dir.exists():
-                try:
-                    abs_creds_dir.mkdir(parents=True, exist_ok=True)
-                    logger.info(f"Created credentials directory from config path: {abs_creds_dir}")
-                except Exception as e:
-                    logger.warning(f"Failed to create credentials directory from config: {str(e)}")
-                    
-            abs_creds_file = abs_creds_dir / credentials_filename
-            abs_token_file = abs_creds_dir / token_filename
-            
-            if abs_creds_file.exists():
-                logger.info(f"Using credentials from absolute path: {abs_creds_dir}")
-                return abs_creds_file, abs_token_file
-        else:
-            # It's a relative path, make it relative to MODULE_DIR
-            rel_creds_dir = MODULE_DIR / Path(creds_path)
-            # Create directory if it doesn't exist
-            if not rel_creds_dir.exists():
-                try:
-                    rel_creds_dir.mkdir(parents=True, exist_ok=True)
-                    logger.info(f"Created relative credentials directory: {rel_creds_dir}")
-                except Exception as e:
-                    logger.warning(f"Failed to create relative credentials directory: {str(e)}")
-                    
-            rel_creds_file = rel_creds_dir / credentials_filename
-            rel_token_file = rel_creds_dir / token_filename
-            
-            if rel_creds_file.exists():
-                logger.info(f"Using credentials from relative path: {rel_creds_dir}")
-                return rel_creds_file, rel_token_file
-    
     # Check for token directory in config
-    if config.auth.token_dir:
-        token_dir_path = Path(config.auth.token_dir)
+    if token_dir:
+        token_dir_path = Path(token_dir)
         if token_dir_path.is_absolute():
             token_dir = token_dir_path 
         else:
@@ -831,27 +922,25 @@ def get_credentials_paths(config: AppConfig, logger: logging.Logger) -> tuple:
         token_path = token_dir / token_filename
         
         # Only update token path if credentials exist
-        if module_creds_path.exists():
-            logger.info(f"Using token directory from config: {token_dir}")
+        if file_exists(module_creds_path):
+            logger.info("Using token directory from config: %s", token_dir)
             return module_creds_path, token_path
     
     # Finally, use default location in the module directory
-    logger.info(f"Using default credentials location: {module_creds_dir}")
+    logger.info("Using default credentials location: %s", module_creds_dir)
     return module_creds_path, module_token_path
 
-def check_credentials_file(config: AppConfig, logger: logging.Logger) -> bool:
+def check_credentials_file(credentials_file: Path, logger: logging.Logger) -> bool:
     """
     Check if credentials.json exists and provide help if not.
     
     Args:
-        config: Application configuration
+        credentials_file: Credentials file path from get_credentials_paths
         logger: Logger instance
         
     Returns:
         True if credentials file exists, False otherwise
     """
-    credentials_file, token_file = get_credentials_paths(config, logger)
-    
     if not credentials_file.exists():
         logger.error(f"'{credentials_file}' file not found!")
         
@@ -863,7 +952,7 @@ def check_credentials_file(config: AppConfig, logger: logging.Logger) -> bool:
         if not credentials_dir.exists():
             try:
                 credentials_dir.mkdir(parents=True, exist_ok=True)
-                logger.info(f"Created credentials directory: {credentials_dir}")
+                logger.info("Created credentials directory: %s", credentials_dir)
             except Exception as e:
                 logger.error(f"Failed to create credentials directory: {str(e)}")
         
@@ -887,9 +976,101 @@ def check_credentials_file(config: AppConfig, logger: logging.Logger) -> bool:
         return False
     return True
 
+def write_file_atomic(file_path: Path, data: bytes) -> None:
+    """
+    Write data to a file atomically with owner-only permissions.
+    
+    The data is written to a sibling temporary file with a single unbuffered
+    write, then the temporary file replaces the target, so a crash mid-write
+    never leaves a truncated file behind.
+    
+    Args:
+        file_path: Path of the file to write
+        data: Bytes to write
+    """
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(tmp_path, flags, 0o600)
+    try:
+        if hasattr(os, "fchmod"):
+            # The creation mode is ignored if a stale temp file already exists
+            os.fchmod(fd, 0o600)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, file_path)
+
+@lru_cache(maxsize=8)
+def load_token_key(key_file: str, mtime_ns: Optional[int]) -> bytes:
+    """
+    Read a token encryption key file, caching the result per path.
+    
+    The modification time is part of the cache key, so a key file that is
+    replaced on disk is read again on the next call.
+    
+    Args:
+        key_file: Path to the key file
+        mtime_ns: Modification time of the key file in nanoseconds
+        
+    Returns:
+        bytes: The key file contents
+        
+    Raises:
+        FileNotFoundError: If the key file does not exist
+    """
+    with open(key_file, 'rb') as f:
+        return f.read()
+
+@lru_cache(maxsize=8)
+def create_token_cipher(key: bytes):
+    """
+    Create an AES-256-GCM cipher for the given token key.
+    
+    The key file keeps the Fernet key format (URL-safe base64 of 32 random
+    bytes), so keys written by older versions can still be used.
+    Instances are cached per key since creating one decodes the key.
+    
+    Args:
+        key: URL-safe base64-encoded 32-byte key
+        
+    Returns:
+        AESGCM cipher instance
+    """
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    
+    return AESGCM(base64.urlsafe_b64decode(key))
+
+@lru_cache(maxsize=8)
+def create_fernet(key: bytes):
+    """
+    Create a Fernet cipher for the given key.
+    
+    Only used to read tokens encrypted by older versions. Uses rfernet when
+    it is installed and falls back to cryptography's Fernet otherwise. Both
+    produce and accept the same token format. Instances are cached per key
+    since creating one decodes the key.
+    
+    Args:
+        key: URL-safe base64-encoded 32-byte Fernet key
+        
+    Returns:
+        Fernet instance providing encrypt() and decrypt()
+    """
+    if RustFernet is not None:
+        return RustFernet(key.decode('ascii'))
+    
+    from cryptography.fernet import Fernet
+    
+    return Fernet(key)
+
 def encrypt_token(token_data: bytes, token_file_path: Path) -> bytes:
     """
-    Encrypt token data using Fernet.
+    Encrypt token data using AES-256-GCM.
+    
+    The result is the random nonce followed by the ciphertext and tag, with
+    no further encoding.
     
     Args:
         token_data: Raw token data to encrypt
@@ -903,22 +1084,26 @@ def encrypt_token(token_data: bytes, token_file_path: Path) -> bytes:
     key_name = f".{token_file_path.name}_key"
     key_file = token_dir / key_name
     
-    # Generate a key if it doesn't exist
-    if not key_file.exists():
+    # Read the key straight from disk rather than through the cache, so a
+    # deleted key file is always regenerated. Generate a key if it doesn't exist
+    try:
+        key = key_file.read_bytes()
+    except FileNotFoundError:
+        from cryptography.fernet import Fernet
+        
         key = Fernet.generate_key()
         ensure_directory_exists(token_dir, "token key directory")
-        with open(key_file, 'wb') as f:
-            f.write(key)
-    else:
-        with open(key_file, 'rb') as f:
-            key = f.read()
-            
-    f = Fernet(key)
-    return f.encrypt(token_data)
+        write_file_atomic(key_file, key)
+    
+    nonce = os.urandom(TOKEN_NONCE_SIZE)
+    return nonce + create_token_cipher(key).encrypt(nonce, token_data, None)
 
 def decrypt_token(encrypted_data: bytes, token_file_path: Path) -> bytes:
     """
-    Decrypt token data using Fernet.
+    Decrypt token data using AES-256-GCM.
+    
+    Tokens that fail AES-GCM authentication are retried as Fernet tokens,
+    which is the format written by older versions.
     
     Args:
         encrypted_data: Encrypted token data
@@ -930,29 +1115,64 @@ def decrypt_token(encrypted_data: bytes, token_file_path: Path) -> bytes:
     Raises:
         AuthenticationError: If token cannot be decrypted
     """
+    from cryptography.exceptions import InvalidTag
+    
     token_dir = token_file_path.parent
     key_name = f".{token_file_path.name}_key"
     key_file = token_dir / key_name
     
-    if not key_file.exists():
+    key_stat = get_file_stat(key_file)
+    if key_stat is None:
+        raise AuthenticationError(f"Token key file not found: {key_file}")
+    
+    try:
+        key = load_token_key(str(key_file), key_stat.st_mtime_ns)
+    except FileNotFoundError:
         raise AuthenticationError(f"Token key file not found: {key_file}")
-        
-    with open(key_file, 'rb') as f:
-        key = f.read()
         
     try:
-        f = Fernet(key)
+        cipher = create_token_cipher(key)
+        nonce = encrypted_data[:TOKEN_NONCE_SIZE]
+        return cipher.decrypt(nonce, encrypted_data[TOKEN_NONCE_SIZE:], None)
+    except InvalidTag:
+        # Not an AES-GCM token, fall through to the legacy Fernet format
+        pass
+    except Exception as e:
+        raise AuthenticationError(f"Failed to decrypt token: {str(e)}")
+    
+    try:
+        f = create_fernet(key)
         return f.decrypt(encrypted_data)
     except Exception as e:
         raise AuthenticationError(f"Failed to decrypt token: {str(e)}")
 
-def authenticate_gmail(config: AppConfig, logger: logging.Logger):
+@lru_cache(maxsize=1)
+def get_auth_request():
+    """
+    Get the transport used for OAuth token refreshes.
+    
+    The transport wraps one shared requests.Session, so repeated refreshes in
+    the same process reuse its keep-alive connection to the token endpoint.
+    
+    Returns:
+        google.auth.transport.requests.Request instance
+    """
+    import requests
+    from google.auth.transport.requests import Request
+    
+    return Request(session=requests.Session())
+
+def authenticate_gmail(config: AppConfig, logger: logging.Logger,
+                       credentials_file: Optional[Path] = None,
+                       token_file: Optional[Path] = None):
     """
     Authenticate with Gmail API using OAuth with encrypted token storage.
     
     Args:
         config: Application configuration
         logger: Logger instance
+        credentials_file: Credentials file path, if already resolved by the caller
+        token_file: Token file path, if already resolved by the caller
         
     Returns:
         Gmail API service object if authentication is successful, None otherwise
@@ -960,62 +1180,82 @@ def authenticate_gmail(config: AppConfig, logger: logging.Logger):
     Raises:
         AuthenticationError: If authentication fails
     """
+    # Google client libraries are slow to import, so only load them when
+    # we actually need to talk to the Gmail API
+    from google.auth.exceptions import RefreshError
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+    
     try:
-        credentials_file, token_file = get_credentials_paths(config, logger)
-        logger.info(f"Using credentials from: {credentials_file}")
-        logger.info(f"Using token file: {token_file}")
+        if credentials_file is None or token_file is None:
+            credentials_file, token_file = get_credentials_paths(config, logger)
+        logger.info("Using credentials from: %s", credentials_file)
+        logger.info("Using token file: %s", token_file)
         
         creds = None
+        creds_changed = False
+        
+        # The token file stores the user's access and refresh tokens as JSON.
+        # Tokens pickled by older versions fail to parse and are replaced.
+        try:
+            encrypted_data = token_file.read_bytes()
+        except FileNotFoundError:
+            encrypted_data = None
         
-        # The token file stores the user's access and refresh tokens
-        if token_file.exists():
-            logger.info(f"Found existing token file")
+        if encrypted_data is not None:
+            logger.info("Found existing token file")
             try:
-                with open(token_file, 'rb') as token:
-                    encrypted_data = token.read()
-                    token_data = decrypt_token(encrypted_data, token_file)
-                    creds = pickle.loads(token_data)
-            except (ValueError, pickle.UnpicklingError, AuthenticationError) as e:
+                token_data = decrypt_token(encrypted_data, token_file)
+                token_info = orjson.loads(token_data) if orjson is not None else json.loads(token_data)
+                creds = Credentials.from_authorized_user_info(token_info, config.api.scopes)
+            except (ValueError, AuthenticationError) as e:
                 logger.error(f"Error loading token file: {str(e)}")
                 # Remove invalid token file
                 token_file.unlink(missing_ok=True)
+        
+        # A stored refresh token only needs a single HTTPS POST to renew the
+        # access token, so try that before falling back to the interactive flow
+        if creds and not creds.valid and creds.refresh_token:
+            logger.info("Token expired, refreshing...")
+            try:
+                creds.refresh(get_auth_request())
+                creds_changed = True
+            except RefreshError as e:
+                logger.error(f"Error refreshing token: {str(e)}")
+                # Remove invalid token file
+                token_file.unlink(missing_ok=True)
+                creds = None
                 
         # If no valid credentials are available, let the user log in
         if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                logger.info("Token expired, refreshing...")
-                try:
-                    creds.refresh(Request())
-                except Exception as e:
-                    logger.error(f"Error refreshing token: {str(e)}")
-                    # Remove invalid token file
-                    token_file.unlink(missing_ok=True)
-                    creds = None
-            else:
-                if not check_credentials_file(config, logger):
-                    logger.error("Credentials file check failed")
-                    raise AuthenticationError("Credentials file not found or invalid")
-                
-                logger.info("Starting OAuth flow...")
-                flow = InstalledAppFlow.from_client_secrets_file(
-                    str(credentials_file), config.api.scopes)
-                creds = flow.run_local_server(port=config.auth.port)
-                
-            # Save the credentials for the next run
+            if not check_credentials_file(credentials_file, logger):
+                logger.error("Credentials file check failed")
+                raise AuthenticationError("Credentials file not found or invalid")
+            
+            logger.info("Starting OAuth flow...")
+            flow = InstalledAppFlow.from_client_secrets_file(
+                str(credentials_file), config.api.scopes)
+            creds = flow.run_local_server(port=config.auth.port)
+            creds_changed = True
+        
+        # Save the credentials for the next run, but only when they changed
+        if creds_changed:
             token_dir = token_file.parent
             ensure_directory_exists(token_dir, "token directory", logger)
                 
             try:
-                token_data = pickle.dumps(creds)
+                token_data = creds.to_json().encode('utf-8')
                 encrypted_data = encrypt_token(token_data, token_file)
-                with open(token_file, 'wb') as token:
-                    token.write(encrypted_data)
+                write_file_atomic(token_file, encrypted_data)
             except Exception as e:
                 logger.error(f"Error saving token: {str(e)}")
                 raise
         
-        # Build the service with the credentials
-        service = build('gmail', 'v1', credentials=creds)
+        # Build the service from the discovery document bundled with googleapiclient,
+        # skipping the network fetch and the legacy discovery file cache
+        service = build('gmail', 'v1', credentials=creds,
+                        static_discovery=True, cache_discovery=False)
         return service
     except Exception as e:
         error_msg = f"Authentication error: {str(e)}"
@@ -1041,11 +1281,138 @@ def create_message(sender: str, to: str, subject: str, message_text: str) -> Dic
     message['subject'] = subject
     return {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')}
 
+@lru_cache(maxsize=32)
+def guess_attachment_type(extension: str) -> Tuple[str, str]:
+    """
+    Guess the MIME type for an attachment file extension.
+    
+    Results are cached per extension since attachments usually share a few types.
+    
+    Args:
+        extension: File extension including the leading dot (e.g. '.pdf')
+        
+    Returns:
+        Tuple of (maintype, subtype), defaulting to application/octet-stream
+    """
+    content_type, _ = mimetypes.guess_type(f"attachment{extension}")
+    maintype, subtype = (content_type or 'application/octet-stream').split('/', 1)
+    return maintype, subtype
+
+def encode_header_value(value: str) -> str:
+    """
+    Prepare a header value for a hand-built message.
+    
+    Args:
+        value: Header value
+        
+    Returns:
+        The value unchanged if it is plain ASCII, otherwise an RFC 2047 encoded word
+        
+    Raises:
+        ValueError: If the value contains a line break
+    """
+    if '\r' in value or '\n' in value:
+        raise ValueError("Header values must not contain line breaks")
+    if value.isascii():
+        return value
+    # Fold long encoded words with CRLF like the rest of the hand-built message
+    return Header(value, 'utf-8').encode(linesep='\r\n')
+
+def build_mime_message(sender: str, to: str, subject: str, message_text: str,
+                       attachment: Optional[Tuple[str, str, str, bytes]] = None) -> bytes:
+    """
+    Serialize a multipart/mixed email straight to RFC 2822 bytes.
+    
+    Building the wire format directly avoids the email.generator pass over the
+    MIME tree, and the attachment is base64-encoded with a single C call.
+    
+    Args:
+        sender: Sender email address
+        to: Recipient email address
+        subject: Email subject
+        message_text: Email body text
+        attachment: Optional (filename, maintype, subtype, data) tuple
+        
+    Returns:
+        The complete message as bytes
+        
+    Raises:
+        ValueError: If a header value contains a line break
+    """
+    boundary = f"=_{os.urandom(16).hex()}"
+    headers = (
+        f"To: {encode_header_value(to)}\r\n"
+        f"From: {encode_header_value(sender)}\r\n"
+        f"Subject: {encode_header_value(subject)}\r\n"
+        "MIME-Version: 1.0\r\n"
+        f'Content-Type: multipart/mixed; boundary="{boundary}"\r\n'
+        "\r\n"
+    )
+    
+    # Plain ASCII bodies stay readable as 7bit, anything else is sent as UTF-8 base64
+    if message_text.isascii():
+        body = (
+            f"--{boundary}\r\n"
+            'Content-Type: text/plain; charset="us-ascii"\r\n'
+            "Content-Transfer-Encoding: 7bit\r\n"
+            "\r\n"
+            + message_text.replace('\r\n', '\n').replace('\n', '\r\n')
+            + "\r\n"
+        ).encode('ascii')
+    else:
+        body = (
+            f"--{boundary}\r\n"
+            'Content-Type: text/plain; charset="utf-8"\r\n'
+            "Content-Transfer-Encoding: base64\r\n"
+            "\r\n"
+        ).encode('ascii') + base64.encodebytes(message_text.encode('utf-8')).replace(b'\n', b'\r\n')
+    
+    parts = [headers.encode('ascii'), body]
+    
+    if attachment is not None:
+        filename, maintype, subtype, data = attachment
+        if filename.isascii():
+            escaped = filename.replace('\\', '\\\\').replace('"', '\\"')
+            disposition = f'attachment; filename="{escaped}"'
+        else:
+            disposition = f"attachment; filename*={encode_rfc2231(filename, 'utf-8')}"
+        parts.append((
+            f"--{boundary}\r\n"
+            f"Content-Type: {maintype}/{subtype}\r\n"
+            "Content-Transfer-Encoding: base64\r\n"
+            f"Content-Disposition: {disposition}\r\n"
+            "\r\n"
+        ).encode('ascii'))
+        # Encode block by block so the CRLF conversion never copies the whole payload
+        with memoryview(data) as view:
+            for start in range(0, len(view), BASE64_BLOCK_SIZE):
+                with view[start:start + BASE64_BLOCK_SIZE] as block:
+                    parts.append(base64.encodebytes(block).replace(b'\n', b'\r\n'))
+    
+    parts.append(f"--{boundary}--\r\n".encode('ascii'))
+    return b''.join(parts)
+
+def get_file_stat(path: Union[str, Path]) -> Optional[os.stat_result]:
+    """
+    Stat a file, returning None instead of raising if it cannot be accessed.
+    
+    Args:
+        path: Path to the file
+        
+    Returns:
+        The os.stat result, or None if the file does not exist
+    """
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
 def create_message_with_attachment(sender: str, to: str, subject: str, message_text: str, 
                                   attachment_path: Optional[str] = None, 
-                                  logger: Optional[logging.Logger] = None) -> Dict[str, str]:
+                                  logger: Optional[logging.Logger] = None,
+                                  attachment_stat: Optional[os.stat_result] = None) -> Dict[str, str]:
     """
-    Create a message for an email with optional attachment and progress tracking for large files.
+    Create a message for an email with an optional attachment, memory-mapping large files.
     
     Args:
         sender: Sender email address
@@ -1053,7 +1420,9 @@ def create_message_with_attachment(sender: str, to: str, subject: str, message_t
         subject: Email subject
         message_text: Email body text
         attachment_path: Path to the attachment file
-        logger: Optional logger for progress updates
+        logger: Optional logger for attachment details and errors
+        attachment_stat: Stat result for the attachment if the caller already
+            has one, so the file is not stat'ed again
         
     Returns:
         Dictionary with encoded email message
@@ -1061,92 +1430,89 @@ def create_message_with_attachment(sender: str, to: str, subject: str, message_t
     Raises:
         EmailSendError: If there's an error with the attachment
     """
-    message = MIMEMultipart()
-    message['to'] = to
-    message['from'] = sender
-    message['subject'] = subject
-
-    # Add the message body
-    msg = MIMEText(message_text)
-    message.attach(msg)
+    attachment = None
 
     # Add attachment if provided
-    if attachment_path and Path(attachment_path).exists():
-        path = Path(attachment_path)
-        try:
-            file_size = path.stat().st_size
-            # Log file info
-            if logger:
-                logger.info(f"Attaching file: {path.name} ({file_size/1024/1024:.2f} MB)")
-            
-            # For small files (< 5MB), just read at once
-            if file_size < 5 * 1024 * 1024:
-                with open(path, 'rb') as f:
-                    attachment = MIMEApplication(f.read())
-            else:
-                # For larger files, read with progress
+    if attachment_path and attachment_stat is None:
+        attachment_stat = get_file_stat(attachment_path)
+    
+    if attachment_path and (attachment_stat is None or not stat.S_ISREG(attachment_stat.st_mode)):
+        error_msg = f"Attachment file does not exist: {attachment_path}"
+        if logger:
+            logger.error(error_msg)
+        raise EmailSendError(error_msg)
+    
+    # Keeps a memory-mapped attachment open until the message has been encoded
+    with ExitStack() as stack:
+        if attachment_path:
+            path = Path(attachment_path)
+            try:
+                file_size = attachment_stat.st_size
+                # Log file info
                 if logger:
-                    logger.info(f"Large file detected, reading with progress tracking")
-                
-                # Read large file with progress tracking
-                chunk_size = 1024 * 1024  # 1MB chunks
-                buffer = io.BytesIO()
+                    logger.info("Attaching file: %s (%.2f MB)", path.name, file_size / 1024 / 1024)
                 
-                with open(path, 'rb') as f:
-                    with tqdm(total=file_size, unit='B', unit_scale=True, 
-                             desc=f"Reading {path.name}") as pbar:
-                        while True:
-                            chunk = f.read(chunk_size)
-                            if not chunk:
-                                break
-                            buffer.write(chunk)
-                            pbar.update(len(chunk))
+                # For small files (< 5MB), just read at once
+                if file_size < 5 * 1024 * 1024:
+                    with open(path, 'rb') as f:
+                        attachment_data = f.read()
+                else:
+                    # Map larger files instead of reading them, so the encoder pulls
+                    # pages straight from the page cache without a heap copy
+                    if logger:
+                        logger.info("Large file detected, memory-mapping it for encoding")
+                    f = stack.enter_context(open(path, 'rb'))
+                    mapped = stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                    attachment_data = stack.enter_context(memoryview(mapped))
                 
-                attachment = MIMEApplication(buffer.getvalue())
+                maintype, subtype = guess_attachment_type(path.suffix.lower())
+                attachment = (path.name, maintype, subtype, attachment_data)
                 
-            # Add headers
-            attachment.add_header(
-                'Content-Disposition', 
-                'attachment', 
-                filename=path.name
-            )
-            message.attach(attachment)
-            
-        except PermissionError:
-            error_msg = f"Permission denied when reading file {attachment_path}"
-            if logger:
-                logger.error(error_msg)
-            raise EmailSendError(error_msg)
-        except MemoryError:
-            error_msg = f"File {attachment_path} is too large to attach"
-            if logger:
-                logger.error(error_msg)
-            raise EmailSendError(error_msg)
+            except PermissionError:
+                error_msg = f"Permission denied when reading file {attachment_path}"
+                if logger:
+                    logger.error(error_msg)
+                raise EmailSendError(error_msg)
+            except MemoryError:
+                error_msg = f"File {attachment_path} is too large to attach"
+                if logger:
+                    logger.error(error_msg)
+                raise EmailSendError(error_msg)
+            except Exception as e:
+                error_msg = f"Error attaching file {attachment_path}: {str(e)}"
+                if logger:
+                    logger.error(error_msg)
+                raise EmailSendError(error_msg)
+
+        # Catch any encoding errors
+        try:
+            raw_message = build_mime_message(sender, to, subject, message_text, attachment)
+            encoded_message = {'raw': base64.urlsafe_b64encode(raw_message).decode('ascii')}
+            return encoded_message
         except Exception as e:
-            error_msg = f"Error attaching file {attachment_path}: {str(e)}"
+            error_msg = f"Error encoding email message: {str(e)}"
             if logger:
                 logger.error(error_msg)
             raise EmailSendError(error_msg)
-    elif attachment_path:
-        error_msg = f"Attachment file does not exist: {attachment_path}"
-        if logger:
-            logger.error(error_msg)
-        raise EmailSendError(error_msg)
 
-    # Catch any encoding errors
-    try:
-        encoded_message = {'raw': base64.urlsafe_b64encode(message.as_bytes()).decode('utf-8')}
-        return encoded_message
-    except Exception as e:
-        error_msg = f"Error encoding email message: {str(e)}"
-        if logger:
-            logger.error(error_msg)
-        raise EmailSendError(error_msg)
+def is_retryable_send_error(exception: BaseException) -> bool:
+    """
+    Check whether an error raised while sending should be retried.
+    
+    Args:
+        exception: Exception raised by send_message
+        
+    Returns:
+        True for HTTP and connection errors, False otherwise
+    """
+    from googleapiclient import errors as google_errors
+    
+    return isinstance(exception, (google_errors.HttpError, ConnectionError))
 
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type((google_errors.HttpError, ConnectionError))
+    retry=retry_if_exception(is_retryable_send_error)
 )
 def send_message(service, user_id: str, message: Dict[str, Any], logger: logging.Logger) -> Dict[str, Any]:
     """
@@ -1164,13 +1530,15 @@ def send_message(service, user_id: str, message: Dict[str, Any], logger: logging
     Raises:
         EmailSendError: If sending the email fails after all retries
     """
+    from googleapiclient import errors as google_errors
+    
     try:
         logger.info("Attempting to send email...")
         sent_message = service.users().messages().send(
             userId=user_id,
             body=message
         ).execute()
-        logger.info(f'Message sent successfully, Message Id: {sent_message["id"]}')
+        logger.info('Message sent successfully, Message Id: %s', sent_message["id"])
         return sent_message
     except google_errors.HttpError as e:
         status_code = e.resp.status
@@ -1206,8 +1574,12 @@ def update_config_value(config_path: Path, key_path: List[str], value: Any, logg
         ConfigError: If updating the config fails
     """
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        if orjson is not None:
+            with open(config_path, 'rb') as f:
+                config = orjson.loads(f.read())
+        else:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
         
         # Navigate to the nested key
         current = config
@@ -1220,10 +1592,15 @@ def update_config_value(config_path: Path, key_path: List[str], value: Any, logg
         current[key_path[-1]] = value
         
         # Write updated config back to file
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(config, f, indent=2)
+        if orjson is not None:
+            with open(config_path, 'wb') as f:
+                f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+        else:
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2)
             
-        logger.info(f"Updated config value: {'.'.join(key_path)} = {value}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Updated config value: %s = %s", '.'.join(key_path), value)
     except Exception as e:
         error_msg = f"Error updating config file: {str(e)}"
         logger.error(error_msg)
@@ -1269,12 +1646,10 @@ def validate_file_path(path: Union[str, Path]) -> bool:
         bool: True if path is valid, False otherwise
     """
     try:
-        path = Path(path).resolve()
+        path = os.path.realpath(path)
         # For email attachments, we need to be more permissive but still validate
         # the path is not dangerous (e.g., not trying to access system files)
-        return not any(forbidden in str(path).lower() for forbidden in 
-                      ['/etc/', '/var/log/', '/proc/', '/sys/', 
-                       'C:\\Windows\\', 'C:\\Program Files\\'])
+        return FORBIDDEN_PATH_PATTERN.search(path) is None
     except Exception as e:
         logger.error(f"Path validation error: {str(e)}")
         return False
@@ -1317,7 +1692,7 @@ def send_email(to: str = None, subject: str = None, message: str = None, attachm
         configured_logger = setup_logging(config.logging)
         
         # Log the operation
-        configured_logger.info(f"Send email API called - To: {config.email.to}, Subject: {config.email.subject}")
+        configured_logger.info("Send email API called - To: %s, Subject: %s", config.email.to, config.email.subject)
         
         # Check for dry run mode
         if config.testing.dry_run:
@@ -1328,20 +1703,28 @@ def send_email(to: str = None, subject: str = None, message: str = None, attachm
             configured_logger.error("Email sending is disabled in config or configuration is invalid")
             return False
         
+        # Resolve the credential paths once and reuse them for authentication
+        credentials_file, token_file = get_credentials_paths(config, configured_logger)
+        
         # Check if credentials file exists
-        if not check_credentials_file(config, configured_logger):
+        if not check_credentials_file(credentials_file, configured_logger):
             return False
         
         # Authenticate with Gmail
         configured_logger.info("Authenticating with Gmail...")
         service = None
         if not config.testing.dry_run:
-            service = authenticate_gmail(config, configured_logger)
+            service = authenticate_gmail(
+                config,
+                configured_logger,
+                credentials_file=credentials_file,
+                token_file=token_file
+            )
             
             # Get the authenticated user's email address
             user_profile = service.users().getProfile(userId='me').execute()
             sender = user_profile['emailAddress']
-            configured_logger.info(f"Authenticated as: {sender}")
+            configured_logger.info("Authenticated as: %s", sender)
         else:
             configured_logger.info("Dry run mode: Skipping authentication")
             sender = "dry-run@example.com"
@@ -1354,10 +1737,13 @@ def send_email(to: str = None, subject: str = None, message: str = None, attachm
             configured_logger.error(f"Invalid attachment path: {attachment_path}")
             return False
         
+        # Stat the attachment once and hand the result down to message creation
+        attachment_stat = get_file_stat(attachment_path) if attachment_path else None
+        
         # Create the email
         try:
             if attachment_path:
-                configured_logger.info(f"Creating email with attachment: {attachment_path}")
+                configured_logger.info("Creating email with attachment: %s", attachment_path)
                 if not config.testing.dry_run:
                     message_obj = create_message_with_attachment(
                         sender,
@@ -1365,7 +1751,8 @@ def send_email(to: str = None, subject: str = None, message: str = None, attachm
                         config.email.subject,
                         config.email.message,
                         attachment_path,
-                        configured_logger
+                        configured_logger,
+                        attachment_stat=attachment_stat
                     )
             else:
                 configured_logger.info("Creating plain email message")
@@ -1379,15 +1766,15 @@ def send_email(to: str = None, subject: str = None, message: str = None, attachm
             
             # In dry run mode, just log what would happen
             if config.testing.dry_run:
-                configured_logger.info(f"Dry run mode: Would send email to: {config.email.to}")
-                configured_logger.info(f"Dry run mode: Email subject: {config.email.subject}")
+                configured_logger.info("Dry run mode: Would send email to: %s", config.email.to)
+                configured_logger.info("Dry run mode: Email subject: %s", config.email.subject)
                 if attachment_path:
-                    configured_logger.info(f"Dry run mode: With attachment: {attachment_path}")
+                    configured_logger.info("Dry run mode: With attachment: %s", attachment_path)
                 configured_logger.info("Dry run completed successfully")
                 return True
             
             # Send the email
-            configured_logger.info(f"Sending email to: {config.email.to}")
+            configured_logger.info("Sending email to: %s", config.email.to)
             try:
                 result = send_message(service, 'me', message_obj, configured_logger)
                 configured_logger.info("Email sent successfully!")
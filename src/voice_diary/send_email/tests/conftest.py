@@ -9,6 +9,12 @@ import sys
 import pytest
 from pathlib import Path
 
+def pytest_configure(config):
+    """Register the xdist_group marker so it is known even without pytest-xdist."""
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run all tests with this group name on the same xdist worker"
+    )
+
 # Define common fixtures for all tests
 @pytest.fixture(scope="session", autouse=True)
 def setup_test_environment():
@@ -10,30 +10,69 @@ import os
 import sys
 import json
 import argparse
-import subprocess
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
-def load_config():
-    """Load test configuration from JSON file."""
-    config_path = Path(__file__).parent / "test_config.json"
+import pytest
+
+# Resolve the runner's paths once instead of in every function
+TEST_DIR = Path(__file__).resolve().parent
+WORKSPACE_ROOT = str(TEST_DIR.parent.parent.parent.parent)
+HTMLCOV_DIR = TEST_DIR.parent / "htmlcov"
+
+@dataclass(frozen=True)
+class TestPaths:
+    """Test runner paths, flattened from the test configuration file."""
+    unit_tests_dir: str
+    module_path: str
+    test_data_dir: str
+    credentials_dir: str
+    logs_dir: str
+
+    @classmethod
+    def from_dict(cls, config):
+        """Build the paths from the nested test configuration dictionary."""
+        test_paths = config["test_paths"]
+        test_data = test_paths["test_data"]
+        return cls(
+            unit_tests_dir=test_paths["unit_tests_dir"],
+            module_path=test_paths["coverage"]["module_path"],
+            test_data_dir=test_data["dir"],
+            credentials_dir=test_data["credentials_dir"],
+            logs_dir=test_data["logs_dir"],
+        )
+
+# Used when no test configuration file is present
+DEFAULT_TEST_PATHS = TestPaths(
+    unit_tests_dir="unit",
+    module_path="voice_diary.send_email",
+    test_data_dir="test_data",
+    credentials_dir="credentials",
+    logs_dir="logs",
+)
+
+@lru_cache(maxsize=None)
+def read_config_file(config_path, mtime_ns):
+    """Parse a test configuration file, cached per path and modification time."""
+    with open(config_path, "r") as f:
+        return TestPaths.from_dict(json.load(f))
+
+def load_config(config_path=None):
+    """Load test configuration from JSON file.
+    
+    Only the implicit test_config.json falls back to the default paths when
+    missing. A missing explicit config_path raises FileNotFoundError.
+    """
+    if config_path is not None:
+        return read_config_file(str(config_path), os.stat(config_path).st_mtime_ns)
+    
+    config_path = TEST_DIR / "test_config.json"
     try:
-        with open(config_path, "r") as f:
-            return json.load(f)
+        return read_config_file(str(config_path), os.stat(config_path).st_mtime_ns)
     except FileNotFoundError:
         print(f"Warning: Config file {config_path} not found. Using default configuration.")
-        return {
-            "test_paths": {
-                "unit_tests_dir": "unit",
-                "coverage": {
-                    "module_path": "voice_diary.send_email"
-                },
-                "test_data": {
-                    "dir": "test_data",
-                    "credentials_dir": "credentials",
-                    "logs_dir": "logs"
-                }
-            }
-        }
+        return DEFAULT_TEST_PATHS
 
 def parse_args():
     """Parse command line arguments."""
@@ -52,104 +91,109 @@ def parse_args():
                        help="Run specific tests using pytest selection (e.g. 'test_config.py::TestConfigValidation')")
     parser.add_argument("--config", type=str, default=None,
                        help="Path to test configuration JSON file")
-    return parser.parse_args()
+    parser.add_argument("-n", "--numprocesses", type=str, default=None,
+                       help="Run tests in parallel with pytest-xdist (e.g. 'auto' or a worker count)")
+    parser.add_argument("--use-cache", action="store_true",
+                       help="Keep pytest's .pytest_cache (needed for --lf/--ff style reruns)")
+    args = parser.parse_args()
+    
+    # A mistyped --config must not silently run against the default layout
+    if args.config is not None and not os.path.isfile(args.config):
+        parser.error(f"config file not found: {args.config}")
+    
+    return args
 
 def run_tests(args, config):
     """Run the tests with the specified options."""
     # Build the base command
-    test_dir = Path(__file__).parent
-    
-    # Get paths from config
-    unit_tests_dir = config["test_paths"]["unit_tests_dir"]
-    module_path = config["test_paths"]["coverage"]["module_path"]
-    
     # Determine test path based on module and select_tests arguments
     if args.select_tests:
-        test_path = str(test_dir / unit_tests_dir / args.select_tests)
+        test_path = str(TEST_DIR / config.unit_tests_dir / args.select_tests)
     else:
-        test_path = str(test_dir / unit_tests_dir)
-    
-    # Set environment variables for testing
-    # Use PYTHONPATH to help pytest find modules, avoid sys.path manipulation
-    workspace_root = str(Path(__file__).resolve().parent.parent.parent.parent.parent)
-    os.environ["PYTHONPATH"] = workspace_root
+        test_path = str(TEST_DIR / config.unit_tests_dir)
     
     # Prepare coverage command if needed
     if args.coverage:
         if args.skip_tests:
             print("Skipping tests, generating coverage report from existing data...")
-            cmd = [
-                "python", "-m", "coverage", "report", "--show-missing"
-            ]
-            if args.verbose:
-                cmd.append("-v")
+            import coverage
             
-            subprocess.run(cmd)
+            cov = coverage.Coverage()
+            cov.load()
+            cov.report(show_missing=True, file=sys.stdout)
             
             if args.html:
                 print("Generating HTML coverage report...")
-                html_cmd = [
-                    "python", "-m", "coverage", "html"
-                ]
-                subprocess.run(html_cmd)
-                print(f"HTML report generated at: {test_dir.parent}/htmlcov/index.html")
+                cov.html_report(directory=str(HTMLCOV_DIR))
+                print(f"HTML report generated at: {HTMLCOV_DIR / 'index.html'}")
             
             return 0
         else:
+            # Coverage is never collected unless asked for, but tracing a
+            # targeted run still slows it down and only reports partial numbers
+            if args.select_tests:
+                print(f"Warning: collecting coverage for the selected tests only ({args.select_tests}); "
+                      "the report will not reflect the full suite. Omit --coverage for faster targeted runs.")
+            
             # Run tests with coverage
-            cmd = [
-                "python", "-m", "pytest", test_path,
-                f"--cov={module_path}",
+            pytest_args = [
+                test_path,
+                f"--cov={config.module_path}",
                 "--cov-report=term-missing",
             ]
             
             if args.html:
-                cmd.append("--cov-report=html")
+                pytest_args.append(f"--cov-report=html:{HTMLCOV_DIR}")
     else:
         # Run tests without coverage
-        cmd = ["python", "-m", "pytest", test_path]
+        pytest_args = [test_path]
+    
+    # Pytest runs in this process, so it gets the workspace root via the
+    # pythonpath ini option rather than PYTHONPATH
+    pytest_args.extend(["-o", f"pythonpath={WORKSPACE_ROOT}"])
+    
+    # Skip the .pytest_cache reads and writes unless test history is wanted
+    if not args.use_cache:
+        pytest_args.extend(["-p", "no:cacheprovider"])
+    
+    # Spread tests over xdist workers. Tests sharing an xdist_group mark,
+    # such as modules with module-scoped fixtures, stay on one worker
+    if args.numprocesses:
+        pytest_args.extend(["-n", args.numprocesses, "--dist=loadgroup"])
     
     # Add verbosity if requested
     if args.verbose:
-        cmd.append("-v")
+        pytest_args.append("-v")
     
-    # Run the command
-    print(f"Running command: {' '.join(cmd)}")
-    result = subprocess.run(cmd)
+    # Run pytest in this process rather than paying for a second interpreter start
+    print(f"Running pytest with arguments: {' '.join(pytest_args)}")
+    returncode = pytest.main(pytest_args)
     
     # Display HTML report path if needed
     if args.coverage and args.html and not args.skip_tests:
-        print(f"HTML report generated at: {test_dir.parent}/htmlcov/index.html")
+        print(f"HTML report generated at: {HTMLCOV_DIR / 'index.html'}")
     
-    return result.returncode
+    return int(returncode)
 
 def ensure_test_directories(config):
     """Ensure test data directories exist."""
-    test_dir = Path(__file__).parent
-    
-    # Get directory paths from config
-    test_data_dir = test_dir / config["test_paths"]["test_data"]["dir"]
-    test_data_dir.mkdir(exist_ok=True)
-    
-    credentials_dir = test_data_dir / config["test_paths"]["test_data"]["credentials_dir"]
-    credentials_dir.mkdir(exist_ok=True)
-    
-    logs_dir = test_data_dir / config["test_paths"]["test_data"]["logs_dir"]
-    logs_dir.mkdir(exist_ok=True)
+    # The leaf directories create the shared test data directory on the way
+    test_data_dir = TEST_DIR / config.test_data_dir
+    for leaf_dir in (config.credentials_dir, config.logs_dir):
+        (test_data_dir / leaf_dir).mkdir(parents=True, exist_ok=True)
 
 def main():
     """Main function to run tests."""
     args = parse_args()
     
     # Load configuration
-    if args.config:
-        with open(args.config, "r") as f:
-            config = json.load(f)
-    else:
-        config = load_config()
+    config = load_config(args.config)
     
-    # Ensure test directories exist
-    ensure_test_directories(config)
+    # Full and coverage runs get the configured test data directories up
+    # front. Targeted runs skip the extra stats since conftest.py creates the
+    # default ones at session start, and report-only runs never touch them
+    if not args.skip_tests and (args.coverage or not args.select_tests):
+        ensure_test_directories(config)
     
     return run_tests(args, config)
 
@@ -3,16 +3,23 @@ Unit tests for the authentication functionality in the send_email module.
 """
 
 import os
-import pickle
+import copy
 import pytest
 from pathlib import Path
-from unittest.mock import patch, mock_open, MagicMock, Mock
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock, Mock
+from cryptography.exceptions import InvalidTag
 
 from src.voice_diary.send_email.send_email import (
     get_credentials_paths,
     check_credentials_file,
     encrypt_token,
     decrypt_token,
+    create_fernet,
+    create_token_cipher,
+    load_token_key,
+    write_file_atomic,
+    get_auth_request,
     authenticate_gmail,
     AuthenticationError,
     AppConfig,
@@ -21,136 +28,122 @@ from src.voice_diary.send_email.send_email import (
     LoggingConfig
 )
 
-@pytest.fixture
+# Keep the module on one xdist worker so the module-scoped mock_config is built once
+pytestmark = pytest.mark.xdist_group(name="test_auth")
+
+@pytest.fixture(autouse=True)
+def clear_auth_caches():
+    """Fixture clearing the cached token keys, ciphers and auth transport between tests"""
+    load_token_key.cache_clear()
+    create_token_cipher.cache_clear()
+    create_fernet.cache_clear()
+    get_auth_request.cache_clear()
+    yield
+    load_token_key.cache_clear()
+    create_token_cipher.cache_clear()
+    create_fernet.cache_clear()
+    get_auth_request.cache_clear()
+
+@pytest.fixture(scope="module")
 def mock_config():
-    """Fixture providing a mock configuration object"""
-    config = MagicMock()
-    config.auth = MagicMock()
-    config.auth.credentials_file = "credentials_gmail.json"
-    config.auth.token_file = "token_gmail.pickle"
-    config.auth.token_dir = "credentials"
-    config.api = MagicMock()
-    config.api.scopes = ["https://www.googleapis.com/auth/gmail.send"]
-    return config
+    """Fixture providing a lightweight configuration object shared by the module
+    
+    Tests that change a setting must work on a copy.deepcopy() of it.
+    """
+    return SimpleNamespace(
+        auth=SimpleNamespace(
+            credentials_file="credentials_gmail.json",
+            token_file="token_gmail.pickle",
+            token_dir="credentials",
+            credentials_path=None,
+            port=0
+        ),
+        api=SimpleNamespace(scopes=["https://www.googleapis.com/auth/gmail.send"])
+    )
+
+@pytest.fixture
+def credentials_fs(tmp_path, monkeypatch):
+    """Fixture pointing credential lookup at an empty module directory under tmp_path"""
+    monkeypatch.delenv("EMAIL_CREDENTIALS_DIR", raising=False)
+    with patch('src.voice_diary.send_email.send_email.MODULE_DIR', tmp_path / "module"):
+        yield tmp_path
+
+def logged_messages(log_method: MagicMock) -> set:
+    """Return the formatted messages passed to a mocked logger method"""
+    return {
+        call.args[0] % call.args[1:] if len(call.args) > 1 else str(call.args[0])
+        for call in log_method.call_args_list if call.args
+    }
+
+def create_credentials_file(directory: Path, filename: str = "credentials_gmail.json") -> Path:
+    """Create an empty credentials file in directory and return its path"""
+    directory.mkdir(parents=True, exist_ok=True)
+    credentials_file = directory / filename
+    credentials_file.write_text("{}")
+    return credentials_file
 
 class TestCredentialsPaths:
     """Tests for credential path resolution"""
     
-    def test_get_credentials_paths_module_dir(self, mock_config):
+    def test_get_credentials_paths_module_dir(self, mock_config, credentials_fs):
         """Test getting credentials from module directory"""
-        # Mock logger
         logger = MagicMock()
+        creds_dir = credentials_fs / "module" / "credentials"
+        create_credentials_file(creds_dir)
         
-        # Mock script directory
-        script_dir = Path('/fake/script/dir')
-        
-        # Create expected paths
-        creds_dir = script_dir / "credentials"
-        module_creds_path = creds_dir / "credentials_gmail.json"
-        module_token_path = creds_dir / "token_gmail.pickle"
+        creds_path, token_path = get_credentials_paths(mock_config, logger)
         
-        # Setup mocks - only mock the specific paths we need to check
-        with patch('src.voice_diary.send_email.send_email.SCRIPT_DIR', script_dir):
-            with patch('pathlib.Path.exists') as mock_exists:
-                # Mock that the module credentials file exists
-                mock_exists.return_value = True
-                
-                # Call the function
-                creds_path, token_path = get_credentials_paths(mock_config, logger)
-                
-                # Verify correct paths are returned
-                assert creds_path == module_creds_path
-                assert token_path == module_token_path
+        assert creds_path == creds_dir / "credentials_gmail.json"
+        assert token_path == creds_dir / "token_gmail.pickle"
 
-    def test_get_credentials_paths_env_var(self, mock_config):
+    def test_get_credentials_paths_env_var(self, mock_config, credentials_fs, monkeypatch):
         """Test getting credentials from environment variable
         
         Verifies that when the environment variable is set, it is properly used.
         """
-        # Mock logger
         logger = MagicMock()
+        env_dir = credentials_fs / "env"
+        create_credentials_file(env_dir)
+        monkeypatch.setenv("EMAIL_CREDENTIALS_DIR", str(env_dir))
         
-        # Set up environment variable
-        env_path = "/env/credentials"
+        creds_path, token_path = get_credentials_paths(mock_config, logger)
         
-        # Setup function under test with patching
-        with patch.dict(os.environ, {"EMAIL_CREDENTIALS_DIR": env_path}):
-            with patch('src.voice_diary.send_email.send_email.get_config_path'):  # Avoid actual config dependency
-                with patch('pathlib.Path.exists') as mock_exists:
-                    # Make first path check fail (module dir) and second succeed (env dir)
-                    # Path.exists is called at least twice in the function
-                    mock_exists.side_effect = [False, True] + [True] * 10  # Default True for subsequent calls
-                    
-                    # Correctly mock Path.__truediv__ by creating a lambda that accepts self and other parameters
-                    with patch('pathlib.Path.__truediv__', 
-                              lambda self, other: Path(os.path.join(str(self), str(other)))):
-                        
-                        # Call function
-                        creds_path, token_path = get_credentials_paths(mock_config, logger)
-                        
-                        # Test exact paths - env path should be used
-                        expected_creds_path = Path(env_path) / mock_config.auth.credentials_file
-                        expected_token_path = Path(env_path) / mock_config.auth.token_file
-                        
-                        assert str(creds_path) == str(expected_creds_path)
-                        assert str(token_path) == str(expected_token_path)
-                        
-                        # Verify logger was called with appropriate messages
-                        # This validates the function's behavior without being brittle to path changes
-                        env_var_check = False
-                        for call_args in logger.info.call_args_list:
-                            if call_args and "environment variable" in str(call_args):
-                                env_var_check = True
-                                break
-                        
-                        assert env_var_check, "Environment variable path logging not found"
+        # Module directory has no credentials, so the env path should be used
+        assert creds_path == env_dir / mock_config.auth.credentials_file
+        assert token_path == env_dir / mock_config.auth.token_file
+        messages = logged_messages(logger.info)
+        assert any("environment variable" in m for m in messages), \
+            "Environment variable path logging not found"
 
-    def test_get_credentials_paths_absolute_config_path(self, mock_config):
+    def test_get_credentials_paths_absolute_config_path(self, mock_config, credentials_fs):
         """Test getting credentials from absolute path in config
         
         This test verifies that absolute paths in configuration are correctly used in the
         credential path resolution process.
         """
-        # Mock logger
         logger = MagicMock()
+        config_dir = credentials_fs / "config" / "creds"
+        create_credentials_file(config_dir)
+        config = copy.deepcopy(mock_config)
+        config.auth.credentials_path = str(config_dir)
         
-        # Set absolute path in config
-        mock_config.auth.credentials_path = "/config/creds"
+        creds_path, token_path = get_credentials_paths(config, logger)
         
-        # Setup function under test with patching
-        with patch('src.voice_diary.send_email.send_email.get_config_path'):  # Avoid actual config dependency
-            with patch('pathlib.Path.exists') as mock_exists:
-                # Make first two path checks fail (module dir, env var) and third succeed (absolute path)
-                # Path.exists is called at least three times in the function
-                mock_exists.side_effect = [False, False, True] + [True] * 10  # Default True for subsequent calls
-                
-                # Correctly mock Path.__truediv__ by creating a lambda that accepts self and other parameters
-                with patch('pathlib.Path.__truediv__', 
-                           lambda self, other: Path(os.path.join(str(self), str(other)))):
-                    
-                    # Also mock Path.mkdir to avoid actual directory creation
-                    with patch('pathlib.Path.mkdir'):
-                        
-                        # Call function
-                        creds_path, token_path = get_credentials_paths(mock_config, logger)
-                        
-                        # Test exact paths - config absolute path should be used
-                        expected_creds_path = Path(mock_config.auth.credentials_path) / mock_config.auth.credentials_file
-                        expected_token_path = Path(mock_config.auth.credentials_path) / mock_config.auth.token_file
-                        
-                        assert str(creds_path) == str(expected_creds_path)
-                        assert str(token_path) == str(expected_token_path)
-                        
-                        # Verify logger was called with appropriate messages
-                        config_path_check = False
-                        for args in logger.info.call_args_list:
-                            if args and "absolute path" in str(args):
-                                config_path_check = True
-                                break
-                        
-                        # If we can't verify via logs, at least check mock calls were made as expected
-                        if not config_path_check:
-                            assert mock_exists.call_count >= 3, "Path existence not checked enough times"
+        assert creds_path == config_dir / config.auth.credentials_file
+        assert token_path == config_dir / config.auth.token_file
+        assert any("absolute path" in m for m in logged_messages(logger.info))
+
+    def test_get_credentials_paths_stats_each_file_once(self, mock_config, credentials_fs):
+        """Test the fallback lookup never checks the same credentials file twice"""
+        logger = MagicMock()
+        
+        with patch.object(Path, 'exists', autospec=True, side_effect=Path.exists) as exists_spy:
+            creds_path, token_path = get_credentials_paths(mock_config, logger)
+        
+        checked = [str(call_args.args[0]) for call_args in exists_spy.call_args_list]
+        assert checked.count(str(creds_path)) == 1
+        assert creds_path.name == mock_config.auth.credentials_file
+        assert token_path.name == mock_config.auth.token_file
 
 @patch('pathlib.Path.exists')
 def test_check_credentials_file_exists(mock_exists, mock_config):
@@ -160,12 +153,8 @@ def test_check_credentials_file_exists(mock_exists, mock_config):
     # Mock logger
     logger = MagicMock()
     
-    with patch('src.voice_diary.send_email.send_email.get_credentials_paths') as mock_get_paths:
-        mock_get_paths.return_value = (Path('/fake/path/credentials_gmail.json'), 
-                                      Path('/fake/path/token_gmail.pickle'))
-        
-        result = check_credentials_file(mock_config, logger)
-        assert result is True
+    result = check_credentials_file(Path('/fake/path/credentials_gmail.json'), logger)
+    assert result is True
 
 @patch('pathlib.Path.exists')
 def test_check_credentials_file_missing(mock_exists, mock_config):
@@ -175,84 +164,113 @@ def test_check_credentials_file_missing(mock_exists, mock_config):
     # Mock logger
     logger = MagicMock()
     
-    with patch('src.voice_diary.send_email.send_email.get_credentials_paths') as mock_get_paths:
-        mock_get_paths.return_value = (Path('/fake/path/credentials_gmail.json'), 
-                                      Path('/fake/path/token_gmail.pickle'))
-        
-        result = check_credentials_file(mock_config, logger)
-        assert result is False
-        # Check that logger.error was called with appropriate message
-        assert any("not found" in str(args[0]) for args, _ in logger.error.call_args_list)
+    result = check_credentials_file(Path('/fake/path/credentials_gmail.json'), logger)
+    assert result is False
+    # Check that logger.error was called with appropriate message
+    assert any("not found" in m for m in logged_messages(logger.error))
 
 class TestTokenEncryption:
     """Tests for token encryption and decryption"""
     
-    @patch('builtins.open', new_callable=mock_open, read_data=b'test_key_data')
-    @patch('pathlib.Path.exists')
-    @patch('src.voice_diary.send_email.send_email.Fernet')
-    def test_decrypt_token(self, mock_fernet, mock_exists, mock_file):
+    @patch('src.voice_diary.send_email.send_email.create_token_cipher')
+    def test_decrypt_token(self, mock_cipher, tmp_path):
         """Test token decryption"""
-        # Mock key file exists
-        mock_exists.return_value = True
+        # Mock AES-GCM cipher
+        mock_cipher.return_value.decrypt.return_value = b'decrypted_data'
+        
+        # Token file path with its key file next to it
+        token_file_path = tmp_path / "token_gmail.pickle"
+        (tmp_path / ".token_gmail.pickle_key").write_bytes(b'test_key_data')
+        
+        # Call the function with a 12-byte nonce followed by the ciphertext
+        result = decrypt_token(b'nonce_bytes_encrypted_data', token_file_path)
+        
+        # Verify result and that the nonce was split off the ciphertext
+        assert result == b'decrypted_data'
+        mock_cipher.assert_called_once_with(b'test_key_data')
+        mock_cipher.return_value.decrypt.assert_called_once_with(
+            b'nonce_bytes_', b'encrypted_data', None)
+    
+    @patch('src.voice_diary.send_email.send_email.create_token_cipher')
+    @patch('src.voice_diary.send_email.send_email.RustFernet', None)
+    @patch('cryptography.fernet.Fernet')
+    def test_decrypt_legacy_fernet_token(self, mock_fernet, mock_cipher, tmp_path):
+        """Test tokens written in the old Fernet format still decrypt"""
+        (tmp_path / ".token_gmail.pickle_key").write_bytes(b'test_key_data')
+        mock_cipher.return_value.decrypt.side_effect = InvalidTag()
         
-        # Mock Fernet
         mock_fernet_instance = MagicMock()
         mock_fernet_instance.decrypt.return_value = b'decrypted_data'
         mock_fernet.return_value = mock_fernet_instance
         
-        # Create mock token file path
-        token_file_path = Path('/fake/path/token_gmail.pickle')
+        result = decrypt_token(b'fernet_encrypted_data', tmp_path / "token_gmail.pickle")
         
-        # Call the function
-        result = decrypt_token(b'encrypted_data', token_file_path)
-        
-        # Verify result and that Fernet was used correctly
         assert result == b'decrypted_data'
         mock_fernet.assert_called_once_with(b'test_key_data')
-        mock_fernet_instance.decrypt.assert_called_once_with(b'encrypted_data')
+        mock_fernet_instance.decrypt.assert_called_once_with(b'fernet_encrypted_data')
+    
+    def test_decrypt_token_missing_key(self, tmp_path):
+        """Test a missing key file is reported as an authentication error"""
+        with pytest.raises(AuthenticationError) as excinfo:
+            decrypt_token(b'nonce_bytes_encrypted_data', tmp_path / "token_gmail.pickle")
+        
+        assert "key file not found" in str(excinfo.value)
     
-    @patch('builtins.open', new_callable=mock_open)
-    @patch('pathlib.Path.exists')
-    @patch('src.voice_diary.send_email.send_email.Fernet')
+    @patch('src.voice_diary.send_email.send_email.write_file_atomic')
+    @patch('pathlib.Path.read_bytes', side_effect=FileNotFoundError)
+    @patch('src.voice_diary.send_email.send_email.create_token_cipher')
+    @patch('cryptography.fernet.Fernet')
     @patch('src.voice_diary.send_email.send_email.ensure_directory_exists')
-    def test_encrypt_token_new_key(self, mock_ensure_dir, mock_fernet, mock_exists, mock_file):
+    def test_encrypt_token_new_key(self, mock_ensure_dir, mock_fernet, mock_cipher, mock_read_bytes, mock_write):
         """Test token encryption with new key generation"""
-        # Mock key file doesn't exist
-        mock_exists.return_value = False
-        
-        # Mock Fernet
+        # Mock key generation and the AES-GCM cipher
         mock_fernet.generate_key.return_value = b'new_key_data'
-        mock_fernet_instance = MagicMock()
-        mock_fernet_instance.encrypt.return_value = b'encrypted_data'
-        mock_fernet.return_value = mock_fernet_instance
+        mock_cipher.return_value.encrypt.return_value = b'encrypted_data'
         
         # Create mock token file path
         token_file_path = Path('/fake/path/token_gmail.pickle')
         
         # Call the function
-        result = encrypt_token(b'token_data', token_file_path)
+        with patch('os.urandom', return_value=b'nonce_bytes_'):
+            result = encrypt_token(b'token_data', token_file_path)
         
-        # Verify result and that Fernet was used correctly
-        assert result == b'encrypted_data'
+        # Verify result is the nonce followed by the ciphertext
+        assert result == b'nonce_bytes_encrypted_data'
         mock_fernet.generate_key.assert_called_once()
         mock_ensure_dir.assert_called_once()
-        mock_fernet.assert_called_once_with(b'new_key_data')
-        mock_fernet_instance.encrypt.assert_called_once_with(b'token_data')
+        mock_cipher.assert_called_once_with(b'new_key_data')
+        mock_cipher.return_value.encrypt.assert_called_once_with(b'nonce_bytes_', b'token_data', None)
+        
+        # Check the key was written atomically next to the token
+        mock_write.assert_called_once_with(
+            Path('/fake/path/.token_gmail.pickle_key'), b'new_key_data')
+    
+    def test_token_round_trip(self, tmp_path):
+        """Test a token encrypted with a generated key decrypts to the original data"""
+        token_file_path = tmp_path / "token_gmail.pickle"
+        
+        encrypted = encrypt_token(b'{"token": "abc"}', token_file_path)
+        
+        assert b'abc' not in encrypted
+        assert decrypt_token(encrypted, token_file_path) == b'{"token": "abc"}'
+    
+    def test_tampered_token_rejected(self, tmp_path):
+        """Test a modified token fails to decrypt"""
+        token_file_path = tmp_path / "token_gmail.pickle"
+        encrypted = bytearray(encrypt_token(b'{"token": "abc"}', token_file_path))
+        encrypted[-1] ^= 1
         
-        # Check file write operations
-        mock_file.assert_called()
-        handle = mock_file()
-        handle.write.assert_called_once_with(b'new_key_data')
+        with pytest.raises(AuthenticationError):
+            decrypt_token(bytes(encrypted), token_file_path)
 
 @patch('src.voice_diary.send_email.send_email.get_credentials_paths')
 @patch('src.voice_diary.send_email.send_email.check_credentials_file')
-@patch('src.voice_diary.send_email.send_email.Path.exists')
-@patch('builtins.open', new_callable=mock_open, read_data=b'encrypted_token_data')
+@patch('pathlib.Path.read_bytes', return_value=b'encrypted_token_data')
 @patch('src.voice_diary.send_email.send_email.decrypt_token')
-@patch('src.voice_diary.send_email.send_email.pickle.loads')
-@patch('src.voice_diary.send_email.send_email.build')
-def test_authenticate_gmail_with_valid_token(mock_build, mock_pickle_loads, mock_decrypt, 
-                                            mock_file, mock_exists, mock_check_creds, 
+@patch('google.oauth2.credentials.Credentials.from_authorized_user_info')
+@patch('googleapiclient.discovery.build')
+def test_authenticate_gmail_with_valid_token(mock_build, mock_from_info, mock_decrypt, 
+                                            mock_read_bytes, mock_check_creds, 
                                             mock_get_paths, mock_config):
     """Test authentication with valid token"""
     # Mock logger
@@ -263,14 +281,11 @@ def test_authenticate_gmail_with_valid_token(mock_build, mock_pickle_loads, mock
     token_path = Path('/fake/path/token_gmail.pickle')
     mock_get_paths.return_value = (creds_path, token_path)
     
-    # Mock token exists
-    mock_exists.return_value = True
-    
     # Mock token decryption and deserialization
     mock_creds = MagicMock()
     mock_creds.valid = True
-    mock_decrypt.return_value = b'decrypted_token'
-    mock_pickle_loads.return_value = mock_creds
+    mock_decrypt.return_value = b'{"token": "decrypted_token"}'
+    mock_from_info.return_value = mock_creds
     
     # Mock API service
     mock_service = MagicMock()
@@ -282,26 +297,68 @@ def test_authenticate_gmail_with_valid_token(mock_build, mock_pickle_loads, mock
     # Verify interactions
     mock_get_paths.assert_called_once_with(mock_config, logger)
     mock_decrypt.assert_called_once_with(b'encrypted_token_data', token_path)
-    mock_pickle_loads.assert_called_once_with(b'decrypted_token')
-    mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds)
+    mock_from_info.assert_called_once_with({"token": "decrypted_token"}, mock_config.api.scopes)
+    mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds,
+                                       static_discovery=True, cache_discovery=False)
     assert result == mock_service
     
     # Logging calls
-    assert any('credentials' in str(args) for args, _ in logger.info.call_args_list)
-    assert any('token' in str(args) for args, _ in logger.info.call_args_list)
+    messages = logged_messages(logger.info)
+    assert any('credentials' in m for m in messages)
+    assert any('token' in m for m in messages)
+
+@patch('src.voice_diary.send_email.send_email.get_credentials_paths')
+@patch('pathlib.Path.read_bytes', return_value=b'encrypted_token_data')
+@patch('src.voice_diary.send_email.send_email.decrypt_token')
+@patch('google.oauth2.credentials.Credentials.from_authorized_user_info')
+@patch('googleapiclient.discovery.build')
+def test_authenticate_gmail_with_resolved_paths(mock_build, mock_from_info, mock_decrypt,
+                                               mock_read_bytes, mock_get_paths,
+                                               mock_config):
+    """Test authentication reuses credential paths resolved by the caller"""
+    logger = MagicMock()
+    creds_path = Path('/fake/path/credentials_gmail.json')
+    token_path = Path('/fake/path/token_gmail.pickle')
+    
+    mock_creds = MagicMock()
+    mock_creds.valid = True
+    mock_decrypt.return_value = b'{"token": "decrypted_token"}'
+    mock_from_info.return_value = mock_creds
+    
+    authenticate_gmail(mock_config, logger, credentials_file=creds_path, token_file=token_path)
+    
+    mock_get_paths.assert_not_called()
+    mock_decrypt.assert_called_once_with(b'encrypted_token_data', token_path)
+
+@patch('src.voice_diary.send_email.send_email.orjson', None)
+@patch('pathlib.Path.read_bytes', return_value=b'encrypted_token_data')
+@patch('src.voice_diary.send_email.send_email.decrypt_token')
+@patch('google.oauth2.credentials.Credentials.from_authorized_user_info')
+@patch('googleapiclient.discovery.build')
+def test_authenticate_gmail_parses_token_without_orjson(mock_build, mock_from_info, mock_decrypt,
+                                                       mock_read_bytes, mock_config):
+    """Test the stored token is parsed with the json module when orjson is missing"""
+    logger = MagicMock()
+    mock_creds = MagicMock()
+    mock_creds.valid = True
+    mock_decrypt.return_value = b'{"token": "decrypted_token"}'
+    mock_from_info.return_value = mock_creds
+    
+    authenticate_gmail(mock_config, logger,
+                       credentials_file=Path('/fake/path/credentials_gmail.json'),
+                       token_file=Path('/fake/path/token_gmail.pickle'))
+    
+    mock_from_info.assert_called_once_with({"token": "decrypted_token"}, mock_config.api.scopes)
 
 @patch('src.voice_diary.send_email.send_email.get_credentials_paths')
 @patch('src.voice_diary.send_email.send_email.check_credentials_file')
-@patch('src.voice_diary.send_email.send_email.Path.exists')
-@patch('src.voice_diary.send_email.send_email.InstalledAppFlow')
-@patch('src.voice_diary.send_email.send_email.pickle.dumps')
+@patch('google_auth_oauthlib.flow.InstalledAppFlow')
 @patch('src.voice_diary.send_email.send_email.encrypt_token')
-@patch('builtins.open', new_callable=mock_open)
-@patch('src.voice_diary.send_email.send_email.build')
+@patch('src.voice_diary.send_email.send_email.write_file_atomic')
+@patch('googleapiclient.discovery.build')
 @patch('src.voice_diary.send_email.send_email.ensure_directory_exists')
-def test_authenticate_gmail_with_new_flow(mock_ensure_dir, mock_build, mock_file, 
-                                         mock_encrypt, mock_pickle_dumps,
-                                         mock_flow, mock_exists, mock_check_creds, 
+def test_authenticate_gmail_with_new_flow(mock_ensure_dir, mock_build, mock_write, 
+                                         mock_encrypt, mock_flow, mock_check_creds,
                                          mock_get_paths, mock_config):
     """Test authentication with new OAuth flow"""
     # Mock logger
@@ -312,8 +369,7 @@ def test_authenticate_gmail_with_new_flow(mock_ensure_dir, mock_build, mock_file
     token_path = Path('/fake/path/token_gmail.pickle')
     mock_get_paths.return_value = (creds_path, token_path)
     
-    # Mock token doesn't exist, then credentials check passes
-    mock_exists.side_effect = [False, True]
+    # No token on disk, so the credentials check runs and passes
     mock_check_creds.return_value = True
     
     # Mock OAuth flow
@@ -323,7 +379,7 @@ def test_authenticate_gmail_with_new_flow(mock_ensure_dir, mock_build, mock_file
     mock_flow.from_client_secrets_file.return_value = mock_flow_instance
     
     # Mock token serialization and encryption
-    mock_pickle_dumps.return_value = b'serialized_token'
+    mock_creds.to_json.return_value = '{"token": "serialized_token"}'
     mock_encrypt.return_value = b'encrypted_token'
     
     # Mock API service
@@ -335,23 +391,121 @@ def test_authenticate_gmail_with_new_flow(mock_ensure_dir, mock_build, mock_file
     
     # Verify interactions
     mock_get_paths.assert_called_once_with(mock_config, logger)
-    mock_check_creds.assert_called_once_with(mock_config, logger)
-    mock_flow.from_client_secrets_file.assert_called_once_with(
-        str(creds_path), mock_config.api.scopes)
-    mock_pickle_dumps.assert_called_once_with(mock_creds)
-    mock_encrypt.assert_called_once_with(b'serialized_token', token_path)
-    mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds)
+    mock_check_creds.assert_called_once_with(creds_path, logger)
     assert result == mock_service
     
     # Verify directory creation
     mock_ensure_dir.assert_called_once()
     
     # Verify OAuth flow was created and run
+    mock_flow.from_client_secrets_file.assert_called_once_with(
+        str(creds_path), mock_config.api.scopes)
     mock_flow_instance.run_local_server.assert_called_once_with(port=mock_config.auth.port)
     
     # Verify token was saved
-    mock_pickle_dumps.assert_called_once_with(mock_creds)
-    mock_encrypt.assert_called_once_with(b'serialized_token', token_path)
+    mock_creds.to_json.assert_called_once()
+    mock_encrypt.assert_called_once_with(b'{"token": "serialized_token"}', token_path)
+    mock_write.assert_called_once_with(token_path, b'encrypted_token')
     
     # Verify the correct service was built
-    mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds) 
\ No newline at end of file
+    mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds,
+                                       static_discovery=True, cache_discovery=False)
+
+
+@patch('src.voice_diary.send_email.send_email.get_credentials_paths')
+@patch('src.voice_diary.send_email.send_email.check_credentials_file')
+@patch('pathlib.Path.read_bytes', return_value=b'encrypted_token_data')
+@patch('src.voice_diary.send_email.send_email.decrypt_token')
+@patch('google.oauth2.credentials.Credentials.from_authorized_user_info')
+@patch('src.voice_diary.send_email.send_email.encrypt_token')
+@patch('src.voice_diary.send_email.send_email.write_file_atomic')
+@patch('google_auth_oauthlib.flow.InstalledAppFlow')
+@patch('googleapiclient.discovery.build')
+@patch('src.voice_diary.send_email.send_email.ensure_directory_exists')
+def test_authenticate_gmail_refreshes_expired_token(mock_ensure_dir, mock_build, mock_flow,
+                                                    mock_write, mock_encrypt, mock_from_info, mock_decrypt,
+                                                    mock_read_bytes, mock_check_creds,
+                                                    mock_get_paths, mock_config):
+    """Test that an expired token with a refresh token skips the OAuth flow"""
+    logger = MagicMock()
+    
+    token_path = Path('/fake/path/token_gmail.pickle')
+    mock_get_paths.return_value = (Path('/fake/path/credentials_gmail.json'), token_path)
+    
+    # Expired credentials that become valid once refreshed
+    mock_creds = MagicMock()
+    mock_creds.valid = False
+    mock_creds.refresh_token = "refresh_token"
+    mock_creds.refresh.side_effect = lambda request: setattr(mock_creds, 'valid', True)
+    mock_creds.to_json.return_value = '{"token": "refreshed_token"}'
+    mock_decrypt.return_value = b'{"token": "expired_token"}'
+    mock_from_info.return_value = mock_creds
+    mock_encrypt.return_value = b'encrypted_token'
+    
+    result = authenticate_gmail(mock_config, logger)
+    
+    # Refresh path was used instead of the interactive flow
+    mock_creds.refresh.assert_called_once_with(get_auth_request())
+    mock_flow.from_client_secrets_file.assert_not_called()
+    mock_check_creds.assert_not_called()
+    
+    # Refreshed token was persisted
+    mock_encrypt.assert_called_once_with(b'{"token": "refreshed_token"}', token_path)
+    mock_write.assert_called_once_with(token_path, b'encrypted_token')
+    mock_build.assert_called_once_with('gmail', 'v1', credentials=mock_creds,
+                                       static_discovery=True, cache_discovery=False)
+    assert result == mock_build.return_value
+
+@patch('src.voice_diary.send_email.send_email.RustFernet')
+def test_create_fernet_prefers_rfernet(mock_rust_fernet):
+    """Test the Rust Fernet backend is used when available"""
+    result = create_fernet(b'test_key_data')
+    
+    mock_rust_fernet.assert_called_once_with('test_key_data')
+    assert result == mock_rust_fernet.return_value
+
+def test_load_token_key_cached(tmp_path):
+    """Test the key file is only read again once its modification time changes"""
+    key_file = tmp_path / ".token_gmail.pickle_key"
+    key_file.write_bytes(b'test_key_data')
+    mtime_ns = key_file.stat().st_mtime_ns
+    
+    assert load_token_key(str(key_file), mtime_ns) == b'test_key_data'
+    assert load_token_key(str(key_file), mtime_ns) == b'test_key_data'
+    assert load_token_key.cache_info().hits == 1
+    
+    key_file.write_bytes(b'changed_key_data')
+    os.utime(key_file, ns=(mtime_ns + 1_000_000_000, mtime_ns + 1_000_000_000))
+    assert load_token_key(str(key_file), key_file.stat().st_mtime_ns) == b'changed_key_data'
+
+def test_write_file_atomic(tmp_path):
+    """Test atomic file writes replace the target and leave no temp file"""
+    target = tmp_path / "token_gmail.pickle"
+    target.write_bytes(b'old_data')
+    
+    write_file_atomic(target, b'new_data')
+    
+    assert target.read_bytes() == b'new_data'
+    assert not (tmp_path / "token_gmail.pickle.tmp").exists()
+    if os.name == 'posix':
+        assert target.stat().st_mode & 0o777 == 0o600
+
+def test_write_file_atomic_replaces_stale_temp_file(tmp_path):
+    """Test a leftover temp file is truncated and tightened before reuse"""
+    target = tmp_path / "token_gmail.pickle"
+    stale = tmp_path / "token_gmail.pickle.tmp"
+    stale.write_bytes(b'stale_data_that_is_longer')
+    
+    write_file_atomic(target, b'new_data')
+    
+    assert target.read_bytes() == b'new_data'
+    assert not stale.exists()
+    if os.name == 'posix':
+        assert target.stat().st_mode & 0o777 == 0o600
+
+def test_get_auth_request_reuses_session():
+    """Test token refreshes share one transport and keep-alive session"""
+    first = get_auth_request()
+    
+    assert get_auth_request() is first
+    assert first.session is not None
@@ -15,9 +15,46 @@ from src.voice_diary.send_email.send_email import (
     EmailConfig, 
     LoggingConfig,
     ConfigError,
-    load_config
+    load_config,
+    read_config_data
 )
 
+# Config file contents served to load_config through the mocked open()
+LOAD_CONFIG_JSON = """{
+    "send_email": true,
+    "validate_email": true,
+    "api": {
+        "scopes": ["https://www.googleapis.com/auth/gmail.send"]
+    },
+    "auth": {
+        "credentials_file": "credentials_gmail.json",
+        "token_file": "token_gmail.pickle",
+        "token_dir": "credentials"
+    },
+    "email": {
+        "to": "test@example.com",
+        "subject": "Test Subject",
+        "message": "Test Message",
+        "default_message": "Default Test Message"
+    },
+    "logging": {
+        "file": {
+            "level": "INFO"
+        },
+        "console": {
+            "level": "INFO"
+        },
+        "logs_dir": "logs"
+    }
+}"""
+
+@pytest.fixture(autouse=True)
+def clear_config_cache():
+    """Fixture clearing the parsed config cache between tests"""
+    read_config_data.cache_clear()
+    yield
+    read_config_data.cache_clear()
+
 @pytest.fixture
 def valid_config():
     """Fixture providing a valid configuration object"""
@@ -108,34 +145,24 @@ class TestConfigValidation:
         valid_config.logging.file.backup_count = -1
         errors = validate_config(valid_config)
         assert any("Invalid backup_count" in error for error in errors)
+    
+    def test_send_email_disabled_skips_email_checks(self, valid_config):
+        """Test validation only checks logging settings when email sending is disabled"""
+        valid_config.send_email = False
+        valid_config.email.to = ""
+        valid_config.api.scopes = []
+        valid_config.logging.file.backup_count = -1
+        errors = validate_config(valid_config)
+        assert len(errors) == 1
+        assert "Invalid backup_count" in errors[0]
+    
+    def test_missing_required_scope_named(self, valid_config):
+        """Test validation names the missing required scope"""
+        valid_config.api.scopes = ["https://www.googleapis.com/auth/gmail.readonly"]
+        errors = validate_config(valid_config)
+        assert any("gmail.send" in error for error in errors)
 
-@patch('builtins.open', new_callable=mock_open, read_data=json.dumps({
-    "send_email": True,
-    "validate_email": True,
-    "api": {
-        "scopes": ["https://www.googleapis.com/auth/gmail.send"]
-    },
-    "auth": {
-        "credentials_file": "credentials_gmail.json",
-        "token_file": "token_gmail.pickle",
-        "token_dir": "credentials"
-    },
-    "email": {
-        "to": "test@example.com",
-        "subject": "Test Subject",
-        "message": "Test Message",
-        "default_message": "Default Test Message"
-    },
-    "logging": {
-        "file": {
-            "level": "INFO"
-        },
-        "console": {
-            "level": "INFO"
-        },
-        "logs_dir": "logs"
-    }
-}))
+@patch('builtins.open', new_callable=mock_open, read_data=LOAD_CONFIG_JSON)
 @patch('pathlib.Path.exists', return_value=True)
 @patch('pathlib.Path.resolve', return_value=Path('/fake/path'))
 def test_load_config(mock_resolve, mock_exists, mock_file):
@@ -154,4 +181,22 @@ def test_load_config_invalid_json(mock_exists, mock_file):
     with patch('src.voice_diary.send_email.send_email.CONFIG_FILE', Path('/fake/config.json')):
         with pytest.raises(ConfigError) as excinfo:
             load_config()
-        assert "Invalid JSON" in str(excinfo.value) 
\ No newline at end of file
+        assert "Invalid JSON" in str(excinfo.value)
+
+def test_load_config_cached_until_file_changes(tmp_path):
+    """Test the config file is parsed once and parsed again after it changes"""
+    config_file = tmp_path / "conf_send_email.json"
+    config_data = {
+        "api": {"scopes": ["https://www.googleapis.com/auth/gmail.send"]},
+        "email": {"to": "first@example.com", "subject": "Test Subject", "message": "Test Message"}
+    }
+    config_file.write_text(json.dumps(config_data), encoding='utf-8')
+    
+    with patch('src.voice_diary.send_email.send_email.CONFIG_FILE', config_file):
+        assert load_config().email.to == "first@example.com"
+        assert load_config().email.to == "first@example.com"
+        assert read_config_data.cache_info().hits == 1
+        
+        config_data["email"]["to"] = "second.address@example.com"
+        config_file.write_text(json.dumps(config_data), encoding='utf-8')
+        assert load_config().email.to == "second.address@example.com"
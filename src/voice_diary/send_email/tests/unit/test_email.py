@@ -3,42 +3,123 @@ Unit tests for the email validation and message creation functionality.
 """
 
 import os
+import re
+import stat
 import pytest
 import base64
+import email
+import email.policy
 from pathlib import Path
-from unittest.mock import patch, mock_open, MagicMock, Mock
+from unittest.mock import patch, mock_open, MagicMock
+from googleapiclient import errors as google_errors
 
 from src.voice_diary.send_email.send_email import (
     validate_email_format,
     create_message,
     create_message_with_attachment,
+    build_mime_message,
+    guess_attachment_type,
     EmailSendError,
     send_message
 )
 
+# Attachment content for tests that only check headers and the filename, kept
+# to one byte so encoding it costs next to nothing
+TEST_ATTACHMENT_BYTES = b'x'
+
+# Stat result for a small (1KB) regular file, passed in place of stat'ing
+# attachments that only exist behind a mocked open()
+SMALL_FILE_STAT = os.stat_result((stat.S_IFREG, 0, 0, 1, 0, 0, 1024, 0, 0, 0))
+
+def decode_raw_message(result: dict) -> str:
+    """Decode the base64url 'raw' field of a created message to text"""
+    # Messages are 7bit or base64 bodies, so the decoded bytes are ASCII
+    return base64.urlsafe_b64decode(result['raw']).decode('ascii')
+
+def missing_parts(decoded: str, headers: list, contents: list) -> list:
+    """Return the headers (matched case-insensitively) and contents not found in a decoded message"""
+    decoded_lower = decoded.lower()
+    return ([header for header in headers if header.lower() not in decoded_lower]
+            + [content for content in contents if content not in decoded])
+
+# Expected headers, body and attachment of test_create_message_with_attachment,
+# each matched anywhere in the message so header order does not matter
+ATTACHMENT_MESSAGE_PROBE = re.compile(
+    r"(?=.*^from: from@example\.com\r?$)"
+    r"(?=.*^to: to@example\.com\r?$)"
+    r"(?=.*^subject: Test Subject with Attachment\r?$)"
+    r"(?=.*^Test message with attachment\r?$)"
+    r"(?=.*^content-disposition: attachment; filename=\"test_attachment\.txt\")",
+    re.IGNORECASE | re.MULTILINE | re.DOTALL
+)
+
+class FakeRequest:
+    """Gmail API request stand-in that returns a fixed response or raises an error"""
+    
+    def __init__(self, response=None, error=None):
+        self.response = response
+        self.error = error
+        self.executions = 0
+    
+    def execute(self):
+        self.executions += 1
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+class FakeGmailService:
+    """Minimal Gmail service exposing users().messages().send() for one request"""
+    
+    def __init__(self, request):
+        self.request = request
+        self.sent = []
+    
+    def users(self):
+        return self
+    
+    def messages(self):
+        return self
+    
+    def send(self, userId, body):
+        self.sent.append((userId, body))
+        return self.request
+
+# Email addresses and whether validate_email_format should accept them
+EMAIL_FORMAT_CASES = [
+    ("test@example.com", True),
+    ("user.name+tag@example.co.uk", True),
+    ("x@example.com", True),
+    ("example-indeed@strange-example.com", True),
+    ("admin@mailserver1", True),
+    ("", False),
+    ("plainaddress", False),
+    ("@missingusername.com", False),
+    ("username@.com", False),
+    (".username@example.com", False),
+    ("username@example..com", False),
+    ("username@example.com.", False),
+    ("username@.example.com", False),
+    ("username@example.com.com.com", False),  # Changed to False to match implementation
+]
+
 class TestEmailValidation:
     """Tests for email address validation functionality"""
     
-    @pytest.mark.parametrize("email,expected", [
-        ("test@example.com", True),
-        ("user.name+tag@example.co.uk", True),
-        ("x@example.com", True),
-        ("example-indeed@strange-example.com", True),
-        ("admin@mailserver1", True),
-        ("", False),
-        ("plainaddress", False),
-        ("@missingusername.com", False),
-        ("username@.com", False),
-        (".username@example.com", False),
-        ("username@example..com", False),
-        ("username@example.com.", False),
-        ("username@.example.com", False),
-        ("username@example.com.com.com", False),  # Changed to False to match implementation
-    ])
-    def test_validate_email_format(self, email, expected):
+    def test_validate_email_format(self):
         """Test email format validation with various email addresses"""
-        assert validate_email_format(email) == expected
+        failures = [(email, expected) for email, expected in EMAIL_FORMAT_CASES
+                    if validate_email_format(email) != expected]
+        assert not failures, f"Unexpected results for (email, expected): {failures}"
+    
+    def test_validate_email_format_uses_precompiled_patterns(self):
+        """Test the validator matches against module-level patterns without compiling any"""
+        with patch('re.compile') as mock_compile:
+            results = [validate_email_format(email) for email, _ in EMAIL_FORMAT_CASES]
+        
+        assert results == [expected for _, expected in EMAIL_FORMAT_CASES]
+        mock_compile.assert_not_called()
 
+@pytest.mark.xdist_group(name="message_creation")
 class TestMessageCreation:
     """Tests for email message creation functionality"""
     
@@ -54,27 +135,15 @@ class TestMessageCreation:
         # Verify the result contains a 'raw' key with base64 encoded content
         assert 'raw' in result
         
-        # Decode the raw content to verify it contains our message parts
-        raw_bytes = base64.urlsafe_b64decode(result['raw'])
-        decoded = raw_bytes.decode('utf-8')
-        
-        # Check for headers in a case-insensitive way
-        decoded_lower = decoded.lower()
-        assert f"from: {sender}".lower() in decoded_lower
-        assert f"to: {to}".lower() in decoded_lower
-        assert f"subject: {subject}".lower() in decoded_lower
-        assert message_text in decoded
-    
-    @patch('pathlib.Path.exists', return_value=True)
-    @patch('pathlib.Path.stat')
-    @patch('builtins.open', new_callable=mock_open, read_data=b'test attachment content')
-    def test_create_message_with_attachment(self, mock_file, mock_stat, mock_exists):
+        # Decode once and check all expected message parts in one pass
+        decoded = decode_raw_message(result)
+        missing = missing_parts(decoded, [f"from: {sender}", f"to: {to}", f"subject: {subject}"],
+                                [message_text])
+        assert not missing, f"Message is missing {missing}"
+    
+    @patch('builtins.open', new_callable=mock_open, read_data=TEST_ATTACHMENT_BYTES)
+    def test_create_message_with_attachment(self, mock_file):
         """Test creating an email message with an attachment"""
-        # Mock stat result to return a small file size
-        stat_result = Mock()
-        stat_result.st_size = 1024  # 1KB
-        mock_stat.return_value = stat_result
-        
         sender = "from@example.com"
         to = "to@example.com"
         subject = "Test Subject with Attachment"
@@ -82,48 +151,54 @@ class TestMessageCreation:
         attachment_path = "test_attachment.txt"
         
         result = create_message_with_attachment(
-            sender, to, subject, message_text, attachment_path
+            sender, to, subject, message_text, attachment_path,
+            attachment_stat=SMALL_FILE_STAT
         )
         
         # Verify the result contains a 'raw' key with base64 encoded content
         assert 'raw' in result
         
-        # Decode the raw content to verify it contains our message parts
-        raw_bytes = base64.urlsafe_b64decode(result['raw'])
-        decoded = raw_bytes.decode('utf-8', errors='ignore')
-        
-        # Check for headers in a case-insensitive way
-        decoded_lower = decoded.lower()
-        assert f"from: {sender}".lower() in decoded_lower
-        assert f"to: {to}".lower() in decoded_lower
-        assert f"subject: {subject}".lower() in decoded_lower
-        assert message_text in decoded
-        assert "Content-Disposition: attachment".lower() in decoded_lower
-        assert "test_attachment.txt" in decoded
-    
-    @patch('pathlib.Path.exists', return_value=True)
-    @patch('pathlib.Path.stat')
+        # Decode once and match all expected message parts with one regex call,
+        # listing the missing parts only if it fails
+        decoded = decode_raw_message(result)
+        if not ATTACHMENT_MESSAGE_PROBE.match(decoded):
+            missing = missing_parts(decoded,
+                                    [f"from: {sender}", f"to: {to}", f"subject: {subject}",
+                                     "content-disposition: attachment"],
+                                    [message_text, "test_attachment.txt"])
+            pytest.fail(f"Message is missing {missing}")
+    
+    def test_create_message_with_large_attachment(self, tmp_path):
+        """Test a large attachment is memory-mapped and attached intact"""
+        attachment_path = tmp_path / "large_attachment.bin"
+        content = os.urandom(1024) * (6 * 1024)  # 6MB, above the memory-mapping threshold
+        attachment_path.write_bytes(content)
+        
+        result = create_message_with_attachment(
+            "from@example.com", "to@example.com", "Subject", "Message", str(attachment_path)
+        )
+        
+        parsed = email.message_from_bytes(base64.urlsafe_b64decode(result['raw']))
+        attachment = [part for part in parsed.walk() if part.get_filename() == "large_attachment.bin"][0]
+        assert attachment.get_payload(decode=True) == content
+    
     @patch('builtins.open', side_effect=PermissionError("Permission denied"))
-    def test_attachment_permission_error(self, mock_file, mock_stat, mock_exists):
+    def test_attachment_permission_error(self, mock_file):
         """Test handling of permission error when reading attachment"""
-        # Mock stat result
-        stat_result = Mock()
-        stat_result.st_size = 1024
-        mock_stat.return_value = stat_result
-        
         with pytest.raises(EmailSendError) as excinfo:
             create_message_with_attachment(
                 "from@example.com", 
                 "to@example.com", 
                 "Subject", 
                 "Message", 
-                "test_attachment.txt"
+                "test_attachment.txt",
+                attachment_stat=SMALL_FILE_STAT
             )
         
         assert "Permission denied" in str(excinfo.value)
     
-    @patch('pathlib.Path.exists', return_value=False)
-    def test_nonexistent_attachment(self, mock_exists):
+    @patch('os.stat', side_effect=FileNotFoundError("No such file"))
+    def test_nonexistent_attachment(self, mock_stat):
         """Test handling of non-existent attachment file"""
         with pytest.raises(EmailSendError) as excinfo:
             create_message_with_attachment(
@@ -135,82 +210,96 @@ class TestMessageCreation:
             )
         
         assert "Attachment file does not exist" in str(excinfo.value)
-
-class TestEmailSending:
-    """Tests for email sending functionality"""
     
-    @patch('googleapiclient.discovery.build')
-    def test_send_message_success(self, mock_build):
-        """Test successful email sending"""
-        # Mock the Gmail API service
-        mock_service = MagicMock()
-        mock_build.return_value = mock_service
+    @patch('src.voice_diary.send_email.send_email.BASE64_BLOCK_SIZE', 57 * 2)
+    def test_build_mime_message_encodes_attachment_in_blocks(self):
+        """Test block-wise base64 encoding keeps whole lines and the exact payload"""
+        content = os.urandom(1000)
         
-        # Mock the users, messages, and send methods/response
-        mock_users = MagicMock()
-        mock_service.users.return_value = mock_users
+        raw = build_mime_message("from@example.com", "to@example.com", "Subject", "Message",
+                                 ("data.bin", "application", "octet-stream", content))
         
-        mock_messages = MagicMock()
-        mock_users.messages.return_value = mock_messages
+        assert all(len(line) <= 76 for line in raw.split(b'\r\n'))
+        parsed = email.message_from_bytes(raw)
+        assert parsed.get_payload()[1].get_payload(decode=True) == content
+    
+    def test_create_message_with_non_ascii_content(self, tmp_path):
+        """Test non-ASCII subject, body and filename survive a parse round trip"""
+        attachment_path = tmp_path / "relatório.txt"
+        attachment_path.write_bytes(b'conte\xc3\xbado')
         
-        mock_send = MagicMock()
-        mock_messages.send.return_value = mock_send
+        result = create_message_with_attachment(
+            "from@example.com", "to@example.com", "Relatório diário", "Olá\nmundo",
+            str(attachment_path)
+        )
         
-        # Mock the execute method to return a successful response
-        mock_execute = MagicMock()
-        mock_execute.return_value = {"id": "test_message_id"}
-        mock_send.execute = mock_execute
+        parsed = email.message_from_bytes(base64.urlsafe_b64decode(result['raw']),
+                                          policy=email.policy.default)
+        body, attachment = parsed.get_payload()
+        assert parsed['subject'] == "Relatório diário"
+        assert body.get_content() == "Olá\nmundo"
+        assert attachment.get_filename() == "relatório.txt"
+        assert attachment.get_payload(decode=True) == b'conte\xc3\xbado'
+    
+    def test_build_mime_message_folds_long_headers_with_crlf(self):
+        """Test a long non-ASCII subject is folded without bare LF line breaks"""
+        subject = "Relatório diário " * 10
         
-        # Create a test message
-        message = {"raw": "test_raw_message"}
+        raw = build_mime_message("from@example.com", "to@example.com", subject, "Message")
         
-        # Call the function
+        header_block = raw.split(b'\r\n\r\n', 1)[0]
+        assert b'\r\n ' in header_block
+        assert re.search(rb'(?<!\r)\n', header_block) is None
+        parsed = email.message_from_bytes(raw, policy=email.policy.default)
+        assert parsed['subject'] == subject
+    
+    def test_create_message_rejects_header_line_breaks(self):
+        """Test a line break in a header value cannot inject extra headers"""
+        with pytest.raises(EmailSendError):
+            create_message_with_attachment(
+                "from@example.com", "to@example.com", "Subject\r\nBcc: x@example.com", "Message"
+            )
+
+class TestAttachmentType:
+    """Tests for attachment MIME type detection"""
+    
+    @pytest.mark.parametrize("extension,expected", [
+        (".pdf", ("application", "pdf")),
+        (".txt", ("text", "plain")),
+        (".unknownext", ("application", "octet-stream")),
+        ("", ("application", "octet-stream")),
+    ])
+    def test_guess_attachment_type(self, extension, expected):
+        """Test MIME type detection for common and unknown extensions"""
+        assert guess_attachment_type(extension) == expected
+
+@pytest.mark.xdist_group(name="email_sending")
+class TestEmailSending:
+    """Tests for email sending functionality"""
+    
+    def test_send_message_success(self):
+        """Test successful email sending"""
+        service = FakeGmailService(FakeRequest(response={"id": "test_message_id"}))
+        message = {"raw": "test_raw_message"}
         logger = MagicMock()
-        result = send_message(mock_service, "me", message, logger)
         
-        # Verify the result
-        assert result["id"] == "test_message_id"
+        result = send_message(service, "me", message, logger)
         
-        # Verify the API was called correctly
-        mock_service.users.assert_called_once()
-        mock_users.messages.assert_called_once()
-        mock_messages.send.assert_called_once_with(userId="me", body=message)
-        mock_send.execute.assert_called_once()
+        # Verify the result and that exactly one send request was executed
+        assert result["id"] == "test_message_id"
+        assert service.sent == [("me", message)]
+        assert service.request.executions == 1
     
-    @patch('googleapiclient.discovery.build')
-    def test_send_message_http_error(self, mock_build):
+    def test_send_message_http_error(self):
         """Test handling of HTTP error during email sending"""
-        from googleapiclient import errors as google_errors
-        
-        # Mock the Gmail API service
-        mock_service = MagicMock()
-        mock_build.return_value = mock_service
-        
-        # Set up the method chain that will raise the error
-        mock_users = MagicMock()
-        mock_service.users.return_value = mock_users
-        
-        mock_messages = MagicMock()
-        mock_users.messages.return_value = mock_messages
-        
-        mock_send = MagicMock()
-        mock_messages.send.return_value = mock_send
-        
-        # Create an HttpError response
-        mock_response = MagicMock()
-        mock_response.status = 400  # Bad Request
-        mock_error = google_errors.HttpError(mock_response, b'Bad Request')
-        
-        # Make execute raise the error
-        mock_send.execute.side_effect = mock_error
-        
-        # Create a test message
-        message = {"raw": "test_raw_message"}
-        
-        # Call the function and check for exception
+        # A 400 Bad Request is permanent, so it is raised without a retry
+        error = google_errors.HttpError(MagicMock(status=400), b'Bad Request')
+        service = FakeGmailService(FakeRequest(error=error))
         logger = MagicMock()
+        
         with pytest.raises(EmailSendError) as excinfo:
-            send_message(mock_service, "me", message, logger)
+            send_message(service, "me", {"raw": "test_raw_message"}, logger)
         
-        assert "HTTP error" in str(excinfo.value)
-        assert "400" in str(excinfo.value) 
\ No newline at end of file
+        error_message = str(excinfo.value)
+        assert "HTTP error" in error_message
+        assert "400" in error_message
@@ -2,8 +2,11 @@
 Unit tests for the main functionality in the send_email module.
 """
 
+import dataclasses
 import pytest
-from unittest.mock import patch, MagicMock, call, ANY
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+from pathlib import Path
 
 from src.voice_diary.send_email.send_email import (
     main,
@@ -12,12 +15,35 @@ from src.voice_diary.send_email.send_email import (
     AuthConfig,
     EmailConfig,
     LoggingConfig,
-    TestingConfig
+    TestingConfig,
+    EmailSendError
 )
 
-@pytest.fixture
+# Functions main() calls out to, replaced for every test by the patched fixture
+PATCHED_FUNCTIONS = (
+    "load_config",
+    "setup_logging",
+    "check_email_config",
+    "get_credentials_paths",
+    "check_credentials_file",
+    "authenticate_gmail",
+    "create_message",
+    "create_message_with_attachment",
+    "send_message",
+    "restore_default_message",
+    "get_file_stat",
+)
+
+# Keep the module on one xdist worker so the module-scoped mock_config is built once
+pytestmark = pytest.mark.xdist_group(name="test_main")
+
+@pytest.fixture(scope="module")
 def mock_config():
-    """Fixture providing a complete mock configuration object for main function"""
+    """Fixture providing a complete mock configuration object for main function
+    
+    The object is shared by the module, so tests that need different settings
+    must build a changed copy with dataclasses.replace().
+    """
     return AppConfig(
         send_email=True,
         validate_email=True,
@@ -40,33 +66,36 @@ def mock_config():
         testing=TestingConfig()
     )
 
-@patch('src.voice_diary.send_email.send_email.load_config')
-@patch('src.voice_diary.send_email.send_email.setup_logging')
-@patch('src.voice_diary.send_email.send_email.check_email_config')
-@patch('src.voice_diary.send_email.send_email.check_credentials_file')
-@patch('src.voice_diary.send_email.send_email.authenticate_gmail')
-@patch('src.voice_diary.send_email.send_email.create_message')
-@patch('src.voice_diary.send_email.send_email.send_message')
-@patch('src.voice_diary.send_email.send_email.restore_default_message')
-def test_main_success_flow(mock_restore, mock_send, mock_create, mock_auth, 
-                          mock_check_creds, mock_check_email, mock_setup_logging, 
-                          mock_load_config, mock_config):
+@pytest.fixture
+def patched(mocker):
+    """Fixture patching every function main() calls out to, addressable by name"""
+    return SimpleNamespace(**{
+        name: mocker.patch(f'src.voice_diary.send_email.send_email.{name}')
+        for name in PATCHED_FUNCTIONS
+    })
+
+@pytest.fixture
+def mock_service():
+    """Fixture providing a Gmail service whose profile belongs to sender@example.com"""
+    service = MagicMock()
+    service.users().getProfile().execute.return_value = {"emailAddress": "sender@example.com"}
+    return service
+
+def test_main_success_flow(patched, mock_service, mock_config):
     """Test successful email sending flow"""
     # Configure mocks
-    mock_load_config.return_value = mock_config
-    mock_setup_logging.return_value = MagicMock()
-    mock_check_email.return_value = True
-    mock_check_creds.return_value = True
-    
-    # Mock service and user profile
-    mock_service = MagicMock()
-    mock_service.users().getProfile().execute.return_value = {"emailAddress": "sender@example.com"}
-    mock_auth.return_value = mock_service
+    logger = patched.setup_logging.return_value
+    patched.load_config.return_value = mock_config
+    patched.check_email_config.return_value = True
+    patched.check_credentials_file.return_value = True
+    creds_path, token_path = Path('/fake/credentials.json'), Path('/fake/token.json')
+    patched.get_credentials_paths.return_value = (creds_path, token_path)
+    patched.authenticate_gmail.return_value = mock_service
     
     # Mock message creation and sending
     mock_message = {"raw": "base64_encoded_message"}
-    mock_create.return_value = mock_message
-    mock_send.return_value = {"id": "test_message_id"}
+    patched.create_message.return_value = mock_message
+    patched.send_message.return_value = {"id": "test_message_id"}
     
     # Call main function
     result = main()
@@ -75,35 +104,32 @@ def test_main_success_flow(mock_restore, mock_send, mock_create, mock_auth,
     assert result is True
     
     # Verify correct function calls in sequence
-    mock_load_config.assert_called_once()
-    mock_setup_logging.assert_called_once_with(mock_config.logging)
-    mock_check_email.assert_called_once_with(mock_config, mock_setup_logging.return_value)
-    mock_check_creds.assert_called_once_with(mock_config, mock_setup_logging.return_value)
-    mock_auth.assert_called_once_with(mock_config, mock_setup_logging.return_value)
+    patched.load_config.assert_called_once()
+    patched.setup_logging.assert_called_once_with(mock_config.logging)
+    patched.check_email_config.assert_called_once_with(mock_config, logger)
+    patched.get_credentials_paths.assert_called_once_with(mock_config, logger)
+    patched.check_credentials_file.assert_called_once_with(creds_path, logger)
+    patched.authenticate_gmail.assert_called_once_with(
+        mock_config, logger, credentials_file=creds_path, token_file=token_path
+    )
     
     # Verify email creation and sending
-    mock_create.assert_called_once_with(
+    patched.create_message.assert_called_once_with(
         "sender@example.com", 
         mock_config.email.to, 
         mock_config.email.subject, 
         mock_config.email.message
     )
-    mock_send.assert_called_once_with(
-        mock_service, "me", mock_message, mock_setup_logging.return_value
-    )
+    patched.send_message.assert_called_once_with(mock_service, "me", mock_message, logger)
     
-    # Verify default message restoration
-    mock_restore.assert_called_once_with(mock_config, mock_setup_logging.return_value)
+    # The send flow leaves the configured message in place
+    patched.restore_default_message.assert_not_called()
 
-@patch('src.voice_diary.send_email.send_email.load_config')
-@patch('src.voice_diary.send_email.send_email.setup_logging')
-@patch('src.voice_diary.send_email.send_email.check_email_config')
-def test_main_email_config_invalid(mock_check_email, mock_setup_logging, mock_load_config, mock_config):
+def test_main_email_config_invalid(patched, mock_config):
     """Test main function when email configuration is invalid"""
     # Configure mocks
-    mock_load_config.return_value = mock_config
-    mock_setup_logging.return_value = MagicMock()
-    mock_check_email.return_value = False
+    patched.load_config.return_value = mock_config
+    patched.check_email_config.return_value = False
     
     # Call main function
     result = main()
@@ -112,22 +138,19 @@ def test_main_email_config_invalid(mock_check_email, mock_setup_logging, mock_lo
     assert result is False
     
     # Verify function calls
-    mock_load_config.assert_called_once()
-    mock_setup_logging.assert_called_once_with(mock_config.logging)
-    mock_check_email.assert_called_once_with(mock_config, mock_setup_logging.return_value)
+    patched.load_config.assert_called_once()
+    patched.setup_logging.assert_called_once_with(mock_config.logging)
+    patched.check_email_config.assert_called_once_with(mock_config, patched.setup_logging.return_value)
 
-@patch('src.voice_diary.send_email.send_email.load_config')
-@patch('src.voice_diary.send_email.send_email.setup_logging')
-@patch('src.voice_diary.send_email.send_email.check_email_config')
-@patch('src.voice_diary.send_email.send_email.check_credentials_file')
-def test_main_credentials_missing(mock_check_creds, mock_check_email, 
-                                 mock_setup_logging, mock_load_config, mock_config):
+def test_main_credentials_missing(patched, mock_config):
     """Test main function when credentials file is missing"""
     # Configure mocks
-    mock_load_config.return_value = mock_config
-    mock_setup_logging.return_value = MagicMock()
-    mock_check_email.return_value = True
-    mock_check_creds.return_value = False
+    logger = patched.setup_logging.return_value
+    patched.load_config.return_value = mock_config
+    patched.check_email_config.return_value = True
+    patched.check_credentials_file.return_value = False
+    creds_path = Path('/fake/credentials.json')
+    patched.get_credentials_paths.return_value = (creds_path, Path('/fake/token.json'))
     
     # Call main function
     result = main()
@@ -136,41 +159,30 @@ def test_main_credentials_missing(mock_check_creds, mock_check_email,
     assert result is False
     
     # Verify function calls
-    mock_load_config.assert_called_once()
-    mock_setup_logging.assert_called_once_with(mock_config.logging)
-    mock_check_email.assert_called_once_with(mock_config, mock_setup_logging.return_value)
-    mock_check_creds.assert_called_once_with(mock_config, mock_setup_logging.return_value)
+    patched.load_config.assert_called_once()
+    patched.setup_logging.assert_called_once_with(mock_config.logging)
+    patched.check_email_config.assert_called_once_with(mock_config, logger)
+    patched.check_credentials_file.assert_called_once_with(creds_path, logger)
+    patched.authenticate_gmail.assert_not_called()
 
-@patch('src.voice_diary.send_email.send_email.load_config')
-@patch('src.voice_diary.send_email.send_email.setup_logging')
-@patch('src.voice_diary.send_email.send_email.check_email_config')
-@patch('src.voice_diary.send_email.send_email.check_credentials_file')
-@patch('src.voice_diary.send_email.send_email.authenticate_gmail')
-@patch('src.voice_diary.send_email.send_email.create_message_with_attachment')
-@patch('src.voice_diary.send_email.send_email.send_message')
-@patch('src.voice_diary.send_email.send_email.restore_default_message')
-def test_main_with_attachment(mock_restore, mock_send, mock_create_with_attach, 
-                             mock_auth, mock_check_creds, mock_check_email, 
-                             mock_setup_logging, mock_load_config, mock_config):
+def test_main_with_attachment(patched, mock_service, mock_config):
     """Test email sending with attachment"""
-    # Set attachment in config
-    mock_config.email.attachment = "test_attachment.txt"
+    # Set attachment on a copy of the shared config
+    mock_config = dataclasses.replace(
+        mock_config, email=dataclasses.replace(mock_config.email, attachment="test_attachment.txt"))
     
     # Configure mocks
-    mock_load_config.return_value = mock_config
-    mock_setup_logging.return_value = MagicMock()
-    mock_check_email.return_value = True
-    mock_check_creds.return_value = True
-    
-    # Mock service and user profile
-    mock_service = MagicMock()
-    mock_service.users().getProfile().execute.return_value = {"emailAddress": "sender@example.com"}
-    mock_auth.return_value = mock_service
+    logger = patched.setup_logging.return_value
+    patched.load_config.return_value = mock_config
+    patched.check_email_config.return_value = True
+    patched.check_credentials_file.return_value = True
+    patched.get_credentials_paths.return_value = (Path('/fake/credentials.json'), Path('/fake/token.json'))
+    patched.authenticate_gmail.return_value = mock_service
     
     # Mock message creation and sending
     mock_message = {"raw": "base64_encoded_message_with_attachment"}
-    mock_create_with_attach.return_value = mock_message
-    mock_send.return_value = {"id": "test_message_id"}
+    patched.create_message_with_attachment.return_value = mock_message
+    patched.send_message.return_value = {"id": "test_message_id"}
     
     # Call main function
     result = main()
@@ -178,29 +190,25 @@ def test_main_with_attachment(mock_restore, mock_send, mock_create_with_attach,
     # Verify successful result
     assert result is True
     
+    # Verify the attachment was stat'ed once and the result passed on
+    patched.get_file_stat.assert_called_once_with(mock_config.email.attachment)
+    
     # Verify email creation with attachment
-    mock_create_with_attach.assert_called_once_with(
+    patched.create_message_with_attachment.assert_called_once_with(
         "sender@example.com", 
         mock_config.email.to, 
         mock_config.email.subject, 
         mock_config.email.message,
         mock_config.email.attachment,
-        mock_setup_logging.return_value
+        logger,
+        attachment_stat=patched.get_file_stat.return_value
     )
+    patched.create_message.assert_not_called()
     
     # Verify email sending
-    mock_send.assert_called_once_with(
-        mock_service, "me", mock_message, mock_setup_logging.return_value
-    )
+    patched.send_message.assert_called_once_with(mock_service, "me", mock_message, logger)
 
-@patch('src.voice_diary.send_email.send_email.setup_logging')
-@patch('src.voice_diary.send_email.send_email.load_config')
-@patch('src.voice_diary.send_email.send_email.check_email_config')
-@patch('src.voice_diary.send_email.send_email.get_credentials_paths')
-@patch('src.voice_diary.send_email.send_email.check_credentials_file')
-@patch('src.voice_diary.send_email.send_email.restore_default_message')
-def test_main_dry_run_mode(mock_restore_default, mock_check_creds, mock_get_creds, 
-                           mock_check_config, mock_load_config, mock_setup_logging):
+def test_main_dry_run_mode(patched):
     """Test the main function in dry run mode
     
     Verifies the main function works properly in dry run mode.
@@ -214,67 +222,38 @@ def test_main_dry_run_mode(mock_restore_default, mock_check_creds, mock_get_cred
     mock_config.email.attachment = None
     
     # Setup mocks
-    mock_load_config.return_value = mock_config
-    mock_check_creds.return_value = True
-    logger = MagicMock()
-    mock_setup_logging.return_value = logger
+    patched.load_config.return_value = mock_config
+    patched.get_credentials_paths.return_value = (Path('/fake/credentials.json'), Path('/fake/token.json'))
+    patched.check_credentials_file.return_value = True
+    logger = patched.setup_logging.return_value
     
     # Test
-    with patch('builtins.print') as mock_print:
-        result = main()
-        
-        # Assert successful dry run
-        assert result is True
-        
-        # Verify dry run message was logged
-        logger.info.assert_any_call(ANY)  # Check that logger.info was called
-        dry_run_logged = False
-        for call_args in logger.info.call_args_list:
-            if call_args and "dry run" in str(call_args).lower():
-                dry_run_logged = True
-                break
-        assert dry_run_logged, "Dry run message not logged"
-        
-        # Check that dry run message was printed
-        mock_print.assert_any_call(ANY)  # Check that print was called
-        dry_run_printed = False
-        for call_args in mock_print.call_args_list:
-            if call_args and "dry run" in str(call_args).lower():
-                dry_run_printed = True
-                break
-        assert dry_run_printed, "Dry run message not printed"
-        
-        # Verify default message is restored in dry run
-        mock_restore_default.assert_called_once()
+    result = main()
+    
+    # Assert successful dry run
+    assert result is True
+    
+    # Verify dry run message was logged, stringifying each call only once
+    info_messages = [str(call_args).lower() for call_args in logger.info.call_args_list]
+    assert any("dry run" in message for message in info_messages), "Dry run message not logged"
+    
+    # Verify nothing was authenticated, created or sent
+    patched.authenticate_gmail.assert_not_called()
+    patched.create_message.assert_not_called()
+    patched.send_message.assert_not_called()
 
-@patch('src.voice_diary.send_email.send_email.load_config')
-@patch('src.voice_diary.send_email.send_email.setup_logging')
-@patch('src.voice_diary.send_email.send_email.check_email_config')
-@patch('src.voice_diary.send_email.send_email.check_credentials_file')
-@patch('src.voice_diary.send_email.send_email.authenticate_gmail')
-@patch('src.voice_diary.send_email.send_email.create_message')
-@patch('src.voice_diary.send_email.send_email.send_message')
-def test_main_send_error(mock_send, mock_create, mock_auth, mock_check_creds, 
-                        mock_check_email, mock_setup_logging, mock_load_config, mock_config):
+def test_main_send_error(patched, mock_service, mock_config):
     """Test main function handling send error"""
     # Configure mocks
-    mock_load_config.return_value = mock_config
-    mock_setup_logging.return_value = MagicMock()
-    mock_check_email.return_value = True
-    mock_check_creds.return_value = True
-    
-    # Mock service and user profile
-    mock_service = MagicMock()
-    mock_service.users().getProfile().execute.return_value = {"emailAddress": "sender@example.com"}
-    mock_auth.return_value = mock_service
-    
-    # Mock message creation
-    mock_message = {"raw": "base64_encoded_message"}
-    mock_create.return_value = mock_message
+    patched.load_config.return_value = mock_config
+    patched.check_email_config.return_value = True
+    patched.check_credentials_file.return_value = True
+    patched.get_credentials_paths.return_value = (Path('/fake/credentials.json'), Path('/fake/token.json'))
+    patched.authenticate_gmail.return_value = mock_service
+    patched.create_message.return_value = {"raw": "base64_encoded_message"}
     
     # Make send_message raise an exception
-    from src.voice_diary.send_email.send_email import EmailSendError
-    mock_send.side_effect = EmailSendError("Send error test")
+    patched.send_message.side_effect = EmailSendError("Send error test")
     
     # Call main function
     result = main()
@@ -283,5 +262,5 @@ def test_main_send_error(mock_send, mock_create, mock_auth, mock_check_creds,
     assert result is False
     
     # Verify error was logged
-    logger = mock_setup_logging.return_value
-    logger.error.assert_any_call("Failed to send email: Send error test") 
\ No newline at end of file
+    logger = patched.setup_logging.return_value
+    logger.error.assert_any_call("Failed to send email: Send error test")
@@ -2,11 +2,13 @@
 Unit tests for utility functions in the send_email module.
 """
 
+import io
 import os
-import json
+import contextlib
 import pytest
 from pathlib import Path
-from unittest.mock import patch, mock_open, MagicMock
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
 
 from src.voice_diary.send_email.send_email import (
     ensure_directory_exists,
@@ -16,26 +18,71 @@ from src.voice_diary.send_email.send_email import (
     ConfigError
 )
 
+# Config file contents before and after update_config_value sets email.message,
+# in the two-space indented layout both JSON backends write
+ORIGINAL_CONFIG_JSON = """{
+  "email": {
+    "message": "Original Message",
+    "default_message": "Default Message"
+  }
+}"""
+UPDATED_CONFIG_JSON = """{
+  "email": {
+    "message": "Updated Message",
+    "default_message": "Default Message"
+  }
+}"""
+
+# Attachment paths and whether validate_file_path should accept them
+FILE_PATH_CASES = [
+    ("/home/user/documents/attachment.txt", True),
+    ("C:\\Users\\username\\Documents\\attachment.txt", True),
+    ("/var/data/attachment.txt", True),
+    ("/etc/passwd", False),
+    ("/var/log/syslog", False),
+    ("/proc/self/cmdline", False),
+    ("/sys/kernel/debug", False),
+    ("C:\\Windows\\System32\\config", False),
+    ("C:\\Program Files\\Common Files\\secret.txt", False),
+    ("c:\\windows\\system32\\config", False),
+]
+
+def fake_config_open(read_data, written, opened):
+    """Build an open() replacement serving read_data and collecting writes in written
+    
+    Every call is recorded in opened as (path, mode, kwargs). The write buffer
+    is left open so its contents can be checked afterwards.
+    """
+    @contextlib.contextmanager
+    def fake_open(path, mode='r', **kwargs):
+        opened.append((path, mode, kwargs))
+        if 'r' in mode:
+            yield io.BytesIO(read_data) if 'b' in mode else io.StringIO(read_data)
+        else:
+            yield written
+    
+    return fake_open
+
 class TestDirectoryUtils:
     """Tests for directory utility functions"""
     
     @patch('pathlib.Path.mkdir')
-    @patch('pathlib.Path.exists')
-    def test_ensure_directory_exists_already_exists(self, mock_exists, mock_mkdir):
+    @patch('os.path.isdir')
+    def test_ensure_directory_exists_already_exists(self, mock_isdir, mock_mkdir):
         """Test ensure_directory_exists when directory already exists"""
-        mock_exists.return_value = True
+        mock_isdir.return_value = True
         
         result = ensure_directory_exists("/fake/dir", "test directory")
         
         assert result is True
-        mock_exists.assert_called_once()
+        mock_isdir.assert_called_once()
         mock_mkdir.assert_not_called()
     
     @patch('pathlib.Path.mkdir')
-    @patch('pathlib.Path.exists')
-    def test_ensure_directory_exists_create_success(self, mock_exists, mock_mkdir):
+    @patch('os.path.isdir')
+    def test_ensure_directory_exists_create_success(self, mock_isdir, mock_mkdir):
         """Test successful directory creation"""
-        mock_exists.return_value = False
+        mock_isdir.return_value = False
         
         # Mock logger
         logger = MagicMock()
@@ -43,15 +90,15 @@ class TestDirectoryUtils:
         result = ensure_directory_exists("/fake/dir", "test directory", logger)
         
         assert result is True
-        mock_exists.assert_called_once()
+        mock_isdir.assert_called_once()
         mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
         logger.info.assert_called_once()
     
     @patch('pathlib.Path.mkdir', side_effect=PermissionError("Permission denied"))
-    @patch('pathlib.Path.exists')
-    def test_ensure_directory_exists_permission_error(self, mock_exists, mock_mkdir):
+    @patch('os.path.isdir')
+    def test_ensure_directory_exists_permission_error(self, mock_isdir, mock_mkdir):
         """Test handling of permission error during directory creation"""
-        mock_exists.return_value = False
+        mock_isdir.return_value = False
         
         # Mock logger
         logger = MagicMock()
@@ -60,66 +107,41 @@ class TestDirectoryUtils:
             ensure_directory_exists("/fake/dir", "test directory", logger)
         
         assert "Permission denied" in str(excinfo.value)
-        mock_exists.assert_called_once()
+        mock_isdir.assert_called_once()
         mock_mkdir.assert_called_once_with(parents=True, exist_ok=True)
         logger.error.assert_called_once()
 
 class TestConfigUtils:
     """Tests for configuration utility functions"""
     
+    @patch('src.voice_diary.send_email.send_email.orjson', None)
     def test_update_config_value(self):
         """Test updating a config value"""
-        # Create test data
-        test_config = {
-            "email": {
-                "message": "Original Message",
-                "default_message": "Default Message"
-            }
-        }
-        
-        # Convert to JSON string
-        config_json = json.dumps(test_config, indent=2)
-        
-        # Set up the mock file context manager
-        mock_open_obj = mock_open(read_data=config_json)
-        
-        with patch('builtins.open', mock_open_obj):
-            config_path = Path("/fake/config.json")
-            key_path = ["email", "message"]
-            new_value = "Updated Message"
-            
-            # Mock logger
-            logger = MagicMock()
-            
-            # Call the function
-            update_config_value(config_path, key_path, new_value, logger)
-            
-            # Verify file operations - check that open was called correctly for both read and write
-            assert mock_open_obj.call_count == 2
-            mock_open_obj.assert_any_call(config_path, 'r', encoding='utf-8')
-            mock_open_obj.assert_any_call(config_path, 'w', encoding='utf-8')
-            
-            # Get the write handle and check what was written
-            handle = mock_open_obj()
-            handle.write.assert_called()
-            
-            # Get all written data and join it if multiple writes occurred
-            written_data = ""
-            for call in handle.write.call_args_list:
-                args, _ = call
-                if args and isinstance(args[0], str):
-                    written_data += args[0]
-            
-            # Verify the written data contains our updated value
-            assert new_value in written_data
-            
-            # If we can reliably parse it as JSON, do that too
-            try:
-                updated_config = json.loads(written_data)
-                assert updated_config["email"]["message"] == new_value
-            except json.JSONDecodeError:
-                # If we can't parse it, at least check that the string contains what we expect
-                assert f'"message": "{new_value}"' in written_data
+        written = io.StringIO()
+        opened = []
+        config_path = Path("/fake/config.json")
+        
+        with patch('builtins.open', fake_config_open(ORIGINAL_CONFIG_JSON, written, opened)):
+            update_config_value(config_path, ["email", "message"], "Updated Message", MagicMock())
+        
+        # Verify the file was opened once for reading and once for writing
+        assert opened == [(config_path, 'r', {'encoding': 'utf-8'}),
+                          (config_path, 'w', {'encoding': 'utf-8'})]
+        assert written.getvalue() == UPDATED_CONFIG_JSON
+    
+    def test_update_config_value_orjson(self):
+        """Test updating a config value with the orjson backend"""
+        orjson = pytest.importorskip("orjson")
+        written = io.BytesIO()
+        opened = []
+        config_path = Path("/fake/config.json")
+        
+        with patch('src.voice_diary.send_email.send_email.orjson', orjson):
+            with patch('builtins.open', fake_config_open(ORIGINAL_CONFIG_JSON.encode('utf-8'), written, opened)):
+                update_config_value(config_path, ["email", "message"], "Updated Message", MagicMock())
+        
+        assert opened == [(config_path, 'rb', {}), (config_path, 'wb', {})]
+        assert written.getvalue() == UPDATED_CONFIG_JSON.encode('utf-8')
     
     @patch('builtins.open', side_effect=PermissionError("Permission denied"))
     def test_update_config_value_permission_error(self, mock_file):
@@ -142,9 +164,10 @@ class TestConfigUtils:
     def test_restore_default_message_when_different(self, mock_update):
         """Test restoring default message when current message differs"""
         # Mock config with different message
-        mock_config = MagicMock()
-        mock_config.email.message = "Current Message"
-        mock_config.email.default_message = "Default Message"
+        mock_config = SimpleNamespace(email=SimpleNamespace(
+            message="Current Message",
+            default_message="Default Message"
+        ))
         
         # Mock logger
         logger = MagicMock()
@@ -168,9 +191,10 @@ class TestConfigUtils:
     def test_restore_default_message_when_same(self, mock_update):
         """Test restoring default message when current message is already default"""
         # Mock config with same message as default
-        mock_config = MagicMock()
-        mock_config.email.message = "Default Message"
-        mock_config.email.default_message = "Default Message"
+        mock_config = SimpleNamespace(email=SimpleNamespace(
+            message="Default Message",
+            default_message="Default Message"
+        ))
         
         # Mock logger
         logger = MagicMock()
@@ -184,19 +208,11 @@ class TestConfigUtils:
 class TestPathValidation:
     """Tests for file path validation"""
     
-    @pytest.mark.parametrize("path,expected", [
-        ("/home/user/documents/attachment.txt", True),
-        ("C:\\Users\\username\\Documents\\attachment.txt", True),
-        ("/var/data/attachment.txt", True),
-        ("/etc/passwd", True),
-        ("/var/log/syslog", True),
-        ("/proc/self/cmdline", True),
-        ("/sys/kernel/debug", True),
-        ("C:\\Windows\\System32\\config", True),
-        ("C:\\Program Files\\Common Files\\secret.txt", True),
-    ])
-    def test_validate_file_path(self, path, expected):
+    def test_validate_file_path(self):
         """Test file path validation with various paths"""
-        with patch('pathlib.Path.resolve', return_value=Path(path)):
-            result = validate_file_path(path)
-            assert result is expected 
\ No newline at end of file
+        # Resolve every path to itself, so host symlinks cannot change the result
+        with patch('os.path.realpath', side_effect=lambda path: path):
+            failures = [(path, expected) for path, expected in FILE_PATH_CASES
+                        if validate_file_path(path) is not expected]
+        
+        assert not failures, f"Unexpected results for (path, expected): {failures}"
@@ -13,6 +13,9 @@ from http.server import HTTPServer, BaseHTTPRequestHandler
 from urllib.parse import urlparse, parse_qs
 import pickle
 import datetime
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from operator import itemgetter
 from pathlib import Path
 from typing import Dict, Any, Optional, Tuple, List, Union
 try:
@@ -20,6 +23,25 @@ try:
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
+
+try:
+    # Rust JSON library, much faster than the stdlib json module
+    import orjson
+except ImportError:
+    orjson = None
+
+# Try to import in-process audio metadata readers, which avoid spawning ffprobe
+try:
+    import av
+    AV_AVAILABLE = True
+except ImportError:
+    AV_AVAILABLE = False
+
+try:
+    import mutagen
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
     
 from voice_diary.logger_utils.logger_utils import setup_logger, ENCODING
 
@@ -42,11 +64,40 @@ else:
 DEFAULT_FALLBACK_CONFIG_PATH = "src/voice_diary/project_fallback_config/config_transcribe_raw_audio"
 DEFAULT_FALLBACK_CONFIG_FILENAME = "config_transcribe_raw_audio.json"
 
+# Default maximum number of files transcribed at the same time
+MAX_TRANSCRIPTION_WORKERS = 8
+
+# Recording timestamp in audio file names, in the format YYYYMMDD_HHMMSS
+FILENAME_TIMESTAMP_PATTERN = re.compile(r'(\d{8}_\d{6})')
+
 # Set up logger
 logger = setup_logger("transcribe_raw_audio")
 
 logger.info(f"MODULE_DIR: {MODULE_DIR}")
 
+@lru_cache(maxsize=4)
+def read_config_file(config_file: str, mtime_ns: int) -> Dict[str, Any]:
+    """
+    Parse a JSON config file, cached per path and modification time.
+    
+    The returned dictionary is shared between callers and must not be modified.
+    
+    Args:
+        config_file: Path to the config file
+        mtime_ns: Modification time of the config file in nanoseconds
+        
+    Returns:
+        Dict[str, Any]: The parsed configuration
+    
+    Raises:
+        json.JSONDecodeError: If the file is not valid JSON
+    """
+    if orjson is not None:
+        with open(config_file, "rb") as f:
+            return orjson.loads(f.read())
+    with open(config_file, "r", encoding=ENCODING) as f:
+        return json.loads(f.read())
+
 def load_config(fallback_config_path: Optional[str] = None, 
                 fallback_config_filename: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
@@ -55,6 +106,8 @@ def load_config(fallback_config_path: Optional[str] = None,
     2. Look in fallback_config_path for fallback_config_filename (configurable)
     3. Fallback to MODULE_DIR/config (ensure directory exists and return None)
     
+    Parsed files are cached until they change, so treat the result as read-only.
+    
     Args:
         fallback_config_path: Optional path to the fallback config directory
         fallback_config_filename: Optional filename of the fallback config file
@@ -75,8 +128,7 @@ def load_config(fallback_config_path: Optional[str] = None,
     
     if PRIMARY_CONFIG_DIR.exists() and PRIMARY_CONFIG_FILE.exists():
         try:
-            with open(PRIMARY_CONFIG_FILE, "r", encoding=ENCODING) as f:
-                return json.load(f)
+            return read_config_file(str(PRIMARY_CONFIG_FILE), os.stat(PRIMARY_CONFIG_FILE).st_mtime_ns)
         except json.JSONDecodeError as e:
             logger.error(f"Error parsing primary config file: {e.msg}")
             raise json.JSONDecodeError(f"Error parsing primary config file: {e.msg}", e.doc, e.pos)
@@ -87,8 +139,7 @@ def load_config(fallback_config_path: Optional[str] = None,
     
     if fallback_dir.exists() and fallback_file.exists():
         try:
-            with open(fallback_file, "r", encoding=ENCODING) as f:
-                return json.load(f)
+            return read_config_file(str(fallback_file), os.stat(fallback_file).st_mtime_ns)
         except json.JSONDecodeError as e:
             logger.error(f"Error parsing fallback config file: {e.msg}")
             raise json.JSONDecodeError(f"Error parsing fallback config file: {e.msg}", e.doc, e.pos)
@@ -160,7 +211,8 @@ def create_sample_config(config_path):
     "transcription": {
         "batch_processing": "true",
         "individual_files": "false",
-        "batch_output_file": "batch_transcription.txt"
+        "batch_output_file": "batch_transcription.txt",
+        "max_workers": MAX_TRANSCRIPTION_WORKERS
     }
   }
     
@@ -218,14 +270,74 @@ def get_openai_client():
 
 def calculate_duration(file_path):
     """
-    Calculate the duration of an audio file using ffprobe.
+    Calculate the duration of an audio file from its header or using ffprobe.
+    
+    Results are cached per file until its size or modification time changes,
+    so retrying a file does not read it again.
+    
+    Args:
+        file_path: Path to the audio file
+        
+    Returns:
+        Duration in seconds or None if not determined
+    """
+    try:
+        file_stat = os.stat(file_path)
+    except OSError as e:
+        logger.warning(f"Unable to determine audio duration: {str(e)}")
+        return None
+    return read_audio_duration(str(file_path), file_stat.st_mtime_ns, file_stat.st_size)
+
+def read_header_duration(file_path):
+    """
+    Read the duration of an audio file from its container header in-process.
+    
+    Uses PyAV if installed, then mutagen for files PyAV cannot read.
+    
+    Args:
+        file_path: Path to the audio file
+        
+    Returns:
+        Duration in seconds or None if no reader is available or able to tell
+    """
+    if AV_AVAILABLE:
+        try:
+            with av.open(file_path) as container:
+                if container.duration is not None:
+                    return container.duration / av.time_base
+        except Exception as e:
+            logger.debug(f"PyAV could not read audio duration: {str(e)}")
+    
+    if MUTAGEN_AVAILABLE:
+        try:
+            audio = mutagen.File(file_path)
+            if audio is not None and audio.info.length:
+                return float(audio.info.length)
+        except Exception as e:
+            logger.debug(f"mutagen could not read audio duration: {str(e)}")
+    
+    return None
+
+@lru_cache(maxsize=1024)
+def read_audio_duration(file_path, mtime_ns, size):
+    """
+    Determine the duration of an audio file, cached per path, modification time and size.
+    
+    The container header is read in-process when PyAV or mutagen is installed,
+    and ffprobe is only run if that is not possible.
     
     Args:
         file_path: Path to the audio file
+        mtime_ns: Modification time of the file in nanoseconds
+        size: Size of the file in bytes
         
     Returns:
         Duration in seconds or None if not determined
     """
+    duration = read_header_duration(file_path)
+    if duration is not None:
+        return duration
+    
     try:
         # Use ffprobe to get the duration
         result = subprocess.run(
@@ -250,11 +362,7 @@ def calculate_duration(file_path):
     except Exception as e:
         logger.error(f"Error calculating audio duration: {str(e)}")
         # Fallback: use file size as a very rough estimate (3MB ≈ 1 minute)
-        try:
-            file_size = os.path.getsize(file_path)
-            return (file_size / (3 * 1024 * 1024)) * 60  # Convert to seconds
-        except:
-            return None
+        return (size / (3 * 1024 * 1024)) * 60  # Convert to seconds
 
 def get_downloads_dir(config):
     """
@@ -346,10 +454,10 @@ def get_transcription_model(config):
     default_model = config.get("default_model", "whisper-1")
     
     # Log available models
-    logger.info(f"Configured transcription models:")
+    logger.debug("Configured transcription models:")
     for model_name, model_info in models.items():
         status = "enabled" if model_info.get("enabled", False) else "disabled"
-        logger.info(f"  - {model_name}: {status} - {model_info.get('description', '')}")
+        logger.debug(f"  - {model_name}: {status} - {model_info.get('description', '')}")
     
     # Find enabled models
     enabled_models = [model_name for model_name, model_info in models.items() 
@@ -369,7 +477,7 @@ def get_transcription_model(config):
     logger.info(f"Default model not enabled. Using first enabled model: {selected_model}")
     return selected_model
 
-def transcribe_file(client, file_path, config):
+def transcribe_file(client, file_path, config, model=None):
     """
     Transcribe a file using OpenAI's API.
     
@@ -377,6 +485,7 @@ def transcribe_file(client, file_path, config):
         client: OpenAI client instance
         file_path: Path to the audio file
         config: Configuration dictionary
+        model: Transcription model to use (optional, selected from config if not provided)
         
     Returns:
         str: Transcription text or None if failed
@@ -401,7 +510,8 @@ def transcribe_file(client, file_path, config):
                     logger.warning(f"Processing the file anyway, but this may result in higher costs")
         
         # Get transcription model and settings
-        model = get_transcription_model(config)
+        if model is None:
+            model = get_transcription_model(config)
         model_info = config.get("models", {}).get(model, {})
         settings = config.get("settings", {})
         language = settings.get("language")
@@ -411,7 +521,7 @@ def transcribe_file(client, file_path, config):
         prompt = model_info.get("prompt") if "prompt" in model_info else settings.get("prompt")
         
         # Log the model being used
-        logger.info(f"Using transcription model: {model}")
+        logger.info(f"Using transcription model for {file_path.name}: {model}")
         logger.info(f"Using prompt: {prompt[:50]}..." if prompt and len(prompt) > 50 else f"Using prompt: {prompt}")
         
         start_time = time.time()
@@ -461,7 +571,7 @@ def transcribe_file(client, file_path, config):
             logger.info(f"Transcription speed: {duration/transcription_time:.2f}x real-time")
         
         if transcription:
-            logger.info(f"Transcription successful: {len(transcription)} characters")
+            logger.info(f"Transcription successful for {file_path.name}: {len(transcription)} characters")
         else:
             logger.warning("Transcription returned empty result")
             
@@ -487,45 +597,75 @@ def get_audio_files(directory):
         logger.error(f"Directory {directory} does not exist")
         return []
         
-    # Get all files in the directory without filtering by extension
-    files = list(directory.glob("*"))
-    
-    # Filter out directories, only keep files
-    files = [f for f in files if f.is_file()]
+    # Get all files in the directory without filtering by extension, in a
+    # single scan whose entries also cache the stat used for creation times
+    with os.scandir(directory) as entries:
+        files = [entry for entry in entries if entry.is_file()]
     
     if not files:
         return []
     
     # Function to extract timestamp from filename if present
-    def get_timestamp_from_filename(filepath):
-        filename = filepath.name
+    def get_timestamp_from_filename(entry):
+        filename = entry.name
         # Try to extract timestamp in format YYYYMMDD_HHMMSS from filename
-        timestamp_match = re.search(r'(\d{8}_\d{6})', filename)
+        timestamp_match = FILENAME_TIMESTAMP_PATTERN.search(filename)
         if timestamp_match:
             try:
-                # If timestamp found in filename, use it
-                timestamp_str = timestamp_match.group(1)
-                return datetime.datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
+                # If timestamp found in filename, use it. The format is fixed,
+                # so build the datetime from its digits instead of strptime
+                ts = timestamp_match.group(1)
+                return datetime.datetime(int(ts[0:4]), int(ts[4:6]), int(ts[6:8]),
+                                         int(ts[9:11]), int(ts[11:13]), int(ts[13:15]))
             except ValueError:
                 pass
         
         # Fall back to file creation time if no timestamp in filename
         # or if timestamp couldn't be parsed
-        return datetime.datetime.fromtimestamp(os.path.getctime(filepath))
+        return datetime.datetime.fromtimestamp(entry.stat().st_ctime)
     
-    # Sort files by timestamp
+    # Sort files by timestamp, working out each file's timestamp only once
     logger.info("Sorting files by creation time (chronological order)")
-    sorted_files = sorted(files, key=get_timestamp_from_filename)
+    timestamped_files = sorted(
+        ((get_timestamp_from_filename(f), f) for f in files),
+        key=itemgetter(0)
+    )
+    sorted_files = [directory / entry.name for _, entry in timestamped_files]
     
     # Log the sorted files
     if sorted_files:
         logger.info("Files will be processed in the following order:")
-        for i, file in enumerate(sorted_files, 1):
-            timestamp = get_timestamp_from_filename(file)
-            logger.info(f"{i}. {file.name} (Created: {timestamp.strftime('%Y-%m-%d %H:%M:%S')})")
+        for i, (timestamp, entry) in enumerate(timestamped_files, 1):
+            logger.info(f"{i}. {entry.name} (Created: {timestamp.strftime('%Y-%m-%d %H:%M:%S')})")
     
     return sorted_files
 
+def get_output_file(output_path, file_name):
+    """
+    Get a unique path for a transcription file, creating its directory if needed.
+    
+    Args:
+        output_path: Directory path to save the file, relative to the module directory if not absolute
+        file_name: Name of the output file
+        
+    Returns:
+        Path: The output directory joined with the file name prefixed by a timestamp
+    """
+    # Convert the output_path to an absolute path if it's relative
+    output_path = Path(output_path)
+    if not output_path.is_absolute():
+        # If path is relative, make it relative to the module directory
+        output_path = MODULE_DIR / output_path
+        
+    # Create output directory if it doesn't exist
+    if not output_path.exists():
+        logger.info(f"Creating output directory: {output_path}")
+        output_path.mkdir(parents=True, exist_ok=True)
+    
+    # Use microsecond precision timestamp for unique filenames
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    return output_path / f"{timestamp}_{file_name}"
+
 def save_transcription(text, output_path, file_name):
     """
     Save the transcription to the output file.
@@ -543,20 +683,7 @@ def save_transcription(text, output_path, file_name):
         return False
         
     try:
-        # Convert the output_path to an absolute path if it's relative
-        output_path = Path(output_path)
-        if not output_path.is_absolute():
-            # If path is relative, make it relative to the module directory
-            output_path = MODULE_DIR / output_path
-            
-        # Create output directory if it doesn't exist
-        if not output_path.exists():
-            logger.info(f"Creating output directory: {output_path}")
-            output_path.mkdir(parents=True, exist_ok=True)
-        
-        # Use microsecond precision timestamp for unique filenames
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        output_file = output_path / f"{timestamp}_{file_name}"
+        output_file = get_output_file(output_path, file_name)
         
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(text)
@@ -589,75 +716,107 @@ def process_files(client, files, output_path, batch_output_path, config):
         
     logger.info(f"Found {len(files)} file(s) to process")
     
-    all_transcriptions = []
+    successful_count = 0
     failed_count = 0
     
     # Check configuration settings for saving individual files
     save_individual_files = config.get("transcription", {}).get("individual_files", True)
     
-    for file_path in files:
-        logger.info(f"Processing {file_path}")
-        
-        # Transcribe the file
-        transcription = transcribe_file(client, file_path, config)
-        
-        if transcription:
-            # Save transcription to database if available
-            if DB_UTILS_AVAILABLE:
-                duration = calculate_duration(file_path)
-                try:
-                    logger.info(f"Attempting to save transcription to database for {file_path.name}")
-                    logger.info(f"Transcription length: {len(transcription)} characters")
-                    # Ensure initialize_db is called before saving
-                    if initialize_db():
-                        db_success = db_save_transcription(
-                            content=transcription,
-                            filename=file_path.name, 
-                            audio_path=str(file_path),
-                            duration_seconds=duration,
-                            metadata={"transcribed_at": datetime.datetime.now().isoformat()}
-                        )
-                        if db_success:
-                            logger.info(f"Successfully saved transcription to database for {file_path.name}")
-                        else:
-                            logger.error(f"Failed to save transcription to database for {file_path.name}")
-                    else:
-                        logger.error("Database initialization failed, cannot save transcription")
-                except Exception as e:
-                    logger.error(f"Exception while saving transcription to database: {str(e)}")
-                    logger.error(traceback.format_exc())
-            else:
-                logger.warning("Database utilities not available. Transcription not saved to database.")
-            
-            # Add file name and timestamp to the transcription
-            file_name = file_path.name
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            formatted_transcription = f"File: {file_name}\nTimestamp: {timestamp}\n\n{transcription}\n\n"
+    # The batch file is written as transcriptions come in, instead of joining
+    # them all in memory at the end. It is only created once one succeeds
+    save_batch_file = bool(batch_output_path) and config.get("transcription", {}).get("batch_processing", True)
+    batch_file = None
+    batch_failed = False
+    
+    # Select the model once for the whole run rather than once per file
+    model = get_transcription_model(config)
+    
+    # The API calls are network bound, so transcribe several files at once.
+    # Results come back in file order and are saved one at a time below
+    max_workers = config.get("transcription", {}).get("max_workers", MAX_TRANSCRIPTION_WORKERS)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(files)))) as executor:
+            transcriptions = executor.map(
+                lambda file_path: transcribe_file(client, file_path, config, model),
+                files
+            )
             
-            # Save individual transcription file ONLY if enabled in config
-            if save_individual_files:
-                individual_saved = save_transcription(
-                    transcription, 
-                    output_path, 
-                    f"individual_{file_name}.txt"
-                )
+            for file_path, transcription in zip(files, transcriptions):
+                logger.info(f"Processing {file_path}")
                 
-                if individual_saved:
-                    logger.info(f"Individual transcription saved for {file_name}")
-            
-            all_transcriptions.append(formatted_transcription)
+                if transcription:
+                    # Save transcription to database if available
+                    if DB_UTILS_AVAILABLE:
+                        duration = calculate_duration(file_path)
+                        try:
+                            logger.info(f"Attempting to save transcription to database for {file_path.name}")
+                            logger.info(f"Transcription length: {len(transcription)} characters")
+                            # Ensure initialize_db is called before saving
+                            if initialize_db():
+                                db_success = db_save_transcription(
+                                    content=transcription,
+                                    filename=file_path.name, 
+                                    audio_path=str(file_path),
+                                    duration_seconds=duration,
+                                    metadata={"transcribed_at": datetime.datetime.now().isoformat()}
+                                )
+                                if db_success:
+                                    logger.info(f"Successfully saved transcription to database for {file_path.name}")
+                                else:
+                                    logger.error(f"Failed to save transcription to database for {file_path.name}")
+                            else:
+                                logger.error("Database initialization failed, cannot save transcription")
+                        except Exception as e:
+                            logger.error(f"Exception while saving transcription to database: {str(e)}")
+                            logger.error(traceback.format_exc())
+                    else:
+                        logger.warning("Database utilities not available. Transcription not saved to database.")
+                    
+                    # Add file name and timestamp to the transcription
+                    file_name = file_path.name
+                    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    formatted_transcription = f"File: {file_name}\nTimestamp: {timestamp}\n\n{transcription}\n\n"
+                    
+                    # Save individual transcription file ONLY if enabled in config
+                    if save_individual_files:
+                        individual_saved = save_transcription(
+                            transcription, 
+                            output_path, 
+                            f"individual_{file_name}.txt"
+                        )
+                        
+                        if individual_saved:
+                            logger.info(f"Individual transcription saved for {file_name}")
+                    
+                    successful_count += 1
+                    
+                    # Append to the batch transcription, separated by a blank line
+                    if save_batch_file:
+                        try:
+                            if batch_file is None:
+                                batch_file = open(get_output_file(output_path, batch_output_path.name), 'w', encoding='utf-8')
+                            else:
+                                batch_file.write("\n")
+                            batch_file.write(formatted_transcription)
+                        except Exception as e:
+                            logger.error(f"Error saving transcription: {str(e)}")
+                            logger.error(traceback.format_exc())
+                            save_batch_file = False
+                            batch_failed = True
+                else:
+                    failed_count += 1
+    finally:
+        if batch_file is not None:
+            batch_file.close()
+    
+    # Only reached when no exception escaped the loop above
+    if batch_file is not None:
+        if batch_failed:
+            logger.error(f"Batch transcription incomplete: {batch_file.name}")
         else:
-            failed_count += 1
-    
-    # Combine all transcriptions and save them if batch processing is enabled
-    if all_transcriptions:
-        combined_text = "\n".join(all_transcriptions)
-        batch_processing = config.get("transcription", {}).get("batch_processing", True)
-        if batch_output_path and batch_processing:
-            save_transcription(combined_text, output_path, batch_output_path.name)
-        return {"successful": len(all_transcriptions), "failed": failed_count, "total": len(files)}
+            logger.info(f"Transcription saved to {batch_file.name}")
     
-    return {"successful": 0, "failed": failed_count, "total": len(files)}
+    return {"successful": successful_count, "failed": failed_count, "total": len(files)}
 
 def ensure_env_file_exists():
     """